@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史职位详情回填
+
+详情提取规则（内容区域选择器、清理规则）修改后，按新规则重新生成历史职位的details：
+1. 优先使用原始页面缓存（PAGE_CACHE_DIR）中的页面，未缓存的页面按限速重新请求（--cache-only 时跳过）
+2. 页面解析是CPU密集型任务，分发到进程池并行执行
+3. 按批次更新历史记录，每隔--save-interval秒（以及结束或中断时）保存历史记录和检查点，
+   中断后再次运行会从检查点继续；JSON存储每次保存都整体重写jobs_history.json，间隔不宜过短
+
+    python backfill.py --workers 4 --batch-size 500
+    python backfill.py --save-interval 600
+    python backfill.py --cache-only
+    python backfill.py --restart    # 忽略检查点，从头开始
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from crawler import BankJobCrawler
+from logging_setup import LOG_FORMAT
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    """工作进程初始化：fork时继承的队列日志处理器没有后台写入线程，改为只输出到stderr，不写日志文件"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+
+
+def _extract_details(page: tuple) -> tuple:
+    """按当前规则提取详情（只解析HTML，不需要爬虫实例），返回 (详情文本或None, 错误信息或None)"""
+    try:
+        return BankJobCrawler._extract_details_html(*page), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Backfill:
+    """按批次重新提取历史职位详情并写回历史记录"""
+
+    def __init__(self, crawler: BankJobCrawler, checkpoint_file: str, workers: int = 0,
+                 batch_size: int = 500, cache_only: bool = False, save_interval: float = 300):
+        self.crawler = crawler
+        self.checkpoint_file = checkpoint_file
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.batch_size = max(1, batch_size)
+        self.cache_only = cache_only
+        self.save_interval = save_interval
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def new_checkpoint(self) -> Dict:
+        """初始状态：last_id为最后完成的职位ID，其余为各类结果的累计数（skipped为--cache-only时未缓存的职位）"""
+        return {'last_id': None, 'done': 0, 'updated': 0, 'unchanged': 0, 'missing': 0, 'skipped': 0, 'failed': 0}
+
+    def load_checkpoint(self) -> Dict:
+        """读取检查点，不存在时返回初始状态"""
+        checkpoint = self.new_checkpoint()
+        if os.path.exists(self.checkpoint_file):
+            try:
+                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                    checkpoint.update(json.load(f))
+            except Exception as e:
+                logger.warning(f"读取检查点失败，从头开始: {e}")
+        return checkpoint
+
+    def save_checkpoint(self, checkpoint: Dict):
+        """原子写入检查点"""
+        checkpoint['updated_at'] = datetime.now().isoformat()
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def _load_page(self, job: Dict, delay: Optional[float]) -> Optional[tuple]:
+        """获取职位详情页的 (原始字节, 编码)，cache_only时只读取缓存"""
+        if not self.cache_only:
+            return self.crawler._load_detail_page(job['url'], delay=delay)
+        cached = self.crawler.page_cache.get(job['url'])
+        if cached is None:
+            return None
+        content, encoding = cached
+        return content, encoding or self.crawler._sniff_encoding(content)
+
+    def _load_pages(self, jobs: List[Dict]) -> List[Optional[tuple]]:
+        """获取一批详情页，需要请求时按DETAIL_WORKERS并发，同一主机的请求间隔由host_throttle限制"""
+        fetch_workers = 1 if self.cache_only else self.crawler.detail_workers
+        if fetch_workers <= 1:
+            return [self._load_page(job, None) for job in jobs]
+        with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='backfill') as executor:
+            return list(executor.map(lambda job: self._load_page(job, 0), jobs))
+
+    def _extract_pages(self, pages: List[tuple]) -> List[tuple]:
+        """解析一批页面，workers>1时使用进程池"""
+        if self._executor is None:
+            return [_extract_details(page) for page in pages]
+        chunksize = max(1, len(pages) // (self.workers * 4))
+        return list(self._executor.map(_extract_details, pages, chunksize=chunksize))
+
+    def save(self, checkpoint: Dict):
+        """保存历史记录，再保存检查点，检查点不会领先于已保存的历史记录"""
+        self.crawler.jobs_history.save()
+        self.save_checkpoint(checkpoint)
+
+    def _process_batch(self, job_ids: List[str], checkpoint: Dict):
+        """重新提取一批职位的详情并更新历史记录（不保存）"""
+        history = self.crawler.jobs_history
+        jobs = [history[job_id] for job_id in job_ids]
+        jobs = [job for job in jobs if job.get('url')]
+        checkpoint['failed'] += len(job_ids) - len(jobs)
+
+        pages = self._load_pages(jobs)
+        loaded = [(job, page) for job, page in zip(jobs, pages) if page is not None]
+        # 只读缓存时未缓存的职位是跳过而不是失败
+        checkpoint['skipped' if self.cache_only else 'failed'] += len(jobs) - len(loaded)
+
+        results = self._extract_pages([page for _, page in loaded])
+        for (job, _), (details, error) in zip(loaded, results):
+            if error is not None:
+                logger.error(f"提取职位详情失败: {job['id']}, 错误: {error}")
+                checkpoint['failed'] += 1
+            elif details is None:
+                checkpoint['missing'] += 1
+            elif details == job.get('details'):
+                checkpoint['unchanged'] += 1
+            else:
+                job['details'] = details
+                job['details_hash'] = self.crawler._fingerprint(details)
+                history[job['id']] = job
+                checkpoint['updated'] += 1
+
+        checkpoint['done'] += len(job_ids)
+        checkpoint['last_id'] = job_ids[-1]
+
+    def run(self, restart: bool = False) -> Dict:
+        """回填所有职位（按ID排序，跳过检查点之前的职位），完成后删除检查点并返回统计"""
+        if self.cache_only and not self.crawler.page_cache:
+            raise ValueError("--cache-only 需要配置 PAGE_CACHE_DIR")
+
+        checkpoint = self.load_checkpoint() if not restart else self.new_checkpoint()
+        job_ids = sorted(self.crawler.jobs_history)
+        if checkpoint['last_id']:
+            job_ids = [job_id for job_id in job_ids if job_id > checkpoint['last_id']]
+            logger.info(f"从检查点继续: 已完成 {checkpoint['done']} 个，剩余 {len(job_ids)} 个")
+        total = checkpoint['done'] + len(job_ids)
+
+        source = '页面缓存' if self.cache_only else ('页面缓存/网络' if self.crawler.page_cache else '网络')
+        logger.info(f"开始回填 {len(job_ids)} 个职位详情，来源: {source}，解析进程数: {self.workers}")
+
+        start = time.perf_counter()
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        last_save = start
+        try:
+            processed = 0
+            for offset in range(0, len(job_ids), self.batch_size):
+                batch = job_ids[offset:offset + self.batch_size]
+                self._process_batch(batch, checkpoint)
+                processed += len(batch)
+                if time.perf_counter() - last_save >= self.save_interval:
+                    self.save(checkpoint)
+                    last_save = time.perf_counter()
+                elapsed = time.perf_counter() - start
+                rate = processed / elapsed if elapsed > 0 else 0
+                remaining = (len(job_ids) - processed) / rate if rate > 0 else 0
+                logger.info(
+                    f"回填进度: {checkpoint['done']}/{total}，更新 {checkpoint['updated']}，"
+                    f"未变化 {checkpoint['unchanged']}，无内容 {checkpoint['missing']}，跳过 {checkpoint['skipped']}，"
+                    f"失败 {checkpoint['failed']}，"
+                    f"{rate:.1f} 个/秒，预计剩余 {remaining:.0f} 秒"
+                )
+        finally:
+            # 中断时也保存已完成批次的结果，下次从这里继续
+            self.save(checkpoint)
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        logger.info(f"回填完成，耗时 {time.perf_counter() - start:.1f} 秒")
+        return checkpoint
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='按当前提取规则重新生成历史职位详情')
+    parser.add_argument('--workers', type=int, default=0, help='解析进程数（默认CPU核数，1为不使用进程池）')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批写回历史记录的职位数')
+    parser.add_argument('--save-interval', type=float, default=300,
+                        help='保存历史记录和检查点的间隔秒数（JSON存储每次保存都重写整个文件）')
+    parser.add_argument('--cache-only', action='store_true', help='只使用页面缓存，未缓存的职位跳过')
+    parser.add_argument('--checkpoint', help='检查点文件（默认在DATA_FILE所在目录）')
+    parser.add_argument('--restart', action='store_true', help='忽略已有检查点，从头开始')
+    args = parser.parse_args()
+
+    crawler = BankJobCrawler()
+    checkpoint_file = args.checkpoint or os.path.join(
+        os.path.dirname(crawler.data_file), 'backfill_checkpoint.json'
+    )
+    try:
+        backfill = Backfill(crawler, checkpoint_file, workers=args.workers,
+                            batch_size=args.batch_size, cache_only=args.cache_only,
+                            save_interval=args.save_interval)
+        backfill.run(restart=args.restart)
+    finally:
+        crawler.close()
+
+
+if __name__ == '__main__':
+    main()
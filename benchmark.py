@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫性能基准测试
+
+基于 page_examples 中保存的示例页面，离线测量爬虫各阶段的性能：
+0. 解析器对比：完整BeautifulSoup解析（[bs4]）与lxml定向解析（[lxml]）的列表页解析 (parse_list) 和详情提取 (extract_details)
+1. 列表页解析 (extract_job_list) 与详情提取 (get_job_details，包括命中原始页面缓存的情况)，不含网络请求
+2. 新职位检测 (check_new_jobs)，使用不同规模的合成历史数据
+3. 历史数据加载 (_load_history) 与保存 (_save_history)、备份写入 (_save_jobs_backup)、通知内容渲染 (_format_job_details_markdown)
+
+每项输出吞吐量、p50/p99延迟和Python内存峰值，结果保存为JSON，可与之前的结果比较：
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from page_cache import PageCache
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'page_examples')
+LIST_PAGE = os.path.join(EXAMPLES_DIR, 'job_lists.html')
+DETAIL_PAGE = os.path.join(EXAMPLES_DIR, 'job_detail.html')
+
+
+def create_crawler(work_dir: str):
+    """创建在临时目录中存放数据和日志的爬虫实例，避免影响正式数据"""
+    os.environ['DATA_FILE'] = os.path.join(work_dir, 'data', 'jobs_history.json')
+    os.environ['HISTORY_DB_FILE'] = os.path.join(work_dir, 'data', 'jobs_history.db')
+    os.environ['HISTORY_INDEX_FILE'] = os.path.join(work_dir, 'data', 'jobs_history.ids')
+    os.environ['BACKUP_FILE'] = os.path.join(work_dir, 'data', 'jobs_backup.txt')
+    os.environ['BACKUP_LOG_DIR'] = os.path.join(work_dir, 'data', 'backup_log')
+    os.environ['LIST_CACHE_FILE'] = ''
+    os.environ['PAGE_CACHE_DIR'] = ''
+    os.environ['NOTIFY_OUTBOX'] = 'false'
+    os.environ['LOG_FILE'] = os.path.join(work_dir, 'logs', 'crawler.log')
+    os.environ['REQUEST_DELAY'] = '0'
+
+    from crawler import BankJobCrawler
+    crawler = BankJobCrawler()
+    # 避免日志输出影响计时
+    logging.getLogger().setLevel(logging.WARNING)
+    return crawler
+
+
+def read_page(path: str) -> bytes:
+    """读取示例页面的原始字节"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class OfflineResponse:
+    """模拟requests响应，用示例页面代替网络请求"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/html'}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func: Callable, rounds: int, items: int = 1, setup: Optional[Callable] = None) -> Dict:
+    """多次运行func，统计p50/p99延迟、吞吐量（items/秒），并用tracemalloc单独运行一次统计Python内存峰值
+
+    setup在每次运行前调用，不计入耗时
+    """
+    if setup:
+        setup()
+    func()  # 预热
+
+    samples = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(samples)
+    return {
+        'rounds': rounds,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'avg_ms': total / rounds * 1000,
+        'throughput': items * rounds / total if total else 0.0,
+        'peak_kb': peak / 1024
+    }
+
+
+def strip_crawl_time(jobs):
+    """去掉每次解析都会变化的crawl_time字段，便于比较结果"""
+    return [{k: v for k, v in job.items() if k != 'crawl_time'} for job in jobs]
+
+
+def reference_parse_job_list(crawler, soup: BeautifulSoup) -> List[Dict]:
+    """参考实现：从列表页的完整BeautifulSoup树中解析职位基本信息，用于校验crawler._parse_list_html"""
+    # 职位链接在 <dt><a href="..." title="...">...</a></dt> 结构中
+    links = []
+    for dt in soup.find_all('dt'):
+        link = dt.find('a')
+        if link:
+            links.append((link.get('href'), link.get('title', '')))
+
+    return crawler._parse_job_links(links)
+
+
+def reference_extract_details(crawler, soup: BeautifulSoup) -> Optional[str]:
+    """参考实现：从详情页的完整BeautifulSoup树中提取详情文本，用于校验crawler._extract_details_html"""
+    # 详情在class为'newstxt'的div中，找不到时尝试其他常见的内容容器
+    content_div = soup.find('div', class_='newstxt')
+    if not content_div:
+        content_div = soup.find('div', class_='content') or soup.find('div', {'id': 'content'})
+        if not content_div:
+            content_div = soup.find('div', class_='article-content') or soup.find('div', class_='job-content')
+
+    if not content_div:
+        return None
+
+    # 移除脚本、广告、分享和免责声明
+    for script in content_div.find_all('script'):
+        script.decompose()
+    for ad_div in content_div.find_all('div', class_=['yindao', 'zhezhao']):
+        ad_div.decompose()
+    for share_div in content_div.find_all('div', {'id': 'ckepop'}):
+        share_div.decompose()
+    for disclaimer in content_div.find_all('div', style=lambda x: x and 'color:#666' in x):
+        disclaimer.decompose()
+
+    return crawler._clean_details_text(content_div.get_text(separator='\n', strip=True))
+
+
+def check_list_parsers(crawler, raw: bytes):
+    """确认定向解析与完整BeautifulSoup解析的结果一致"""
+    html = raw.decode('gbk', errors='replace')
+    full_jobs = reference_parse_job_list(crawler, BeautifulSoup(html, 'lxml'))
+    fast_jobs = crawler._parse_list_html(raw, crawler._sniff_encoding(raw))
+    if strip_crawl_time(full_jobs) != strip_crawl_time(fast_jobs):
+        print("❌ 列表页定向解析结果与完整解析不一致")
+        sys.exit(1)
+
+
+def check_detail_extractors(crawler, raw: bytes):
+    """确认快速提取与完整BeautifulSoup解析的详情文本一致"""
+    html = raw.decode('gbk', errors='replace')
+    full_details = reference_extract_details(crawler, BeautifulSoup(html, 'lxml'))
+    fast_details = crawler._extract_details_html(raw, crawler._sniff_encoding(raw))
+    if full_details != fast_details:
+        print("❌ 详情页快速提取结果与完整解析不一致")
+        sys.exit(1)
+
+
+def synthetic_history(size: int, template: Dict) -> Dict:
+    """生成指定规模的合成历史数据，每条记录带有与示例页面相同长度的详情"""
+    history = {}
+    for i in range(size):
+        job = dict(template)
+        job['id'] = f"synthetic{i}"
+        job['url'] = f"http://www.yinhangzhaopin.com/synthetic/{i}.htm"
+        history[job['id']] = job
+    return history
+
+
+def run_benchmarks(crawler, rounds: int, sizes: List[int]) -> Dict:
+    """运行所有阶段的基准测试"""
+    list_raw = read_page(LIST_PAGE)
+    detail_raw = read_page(DETAIL_PAGE)
+    check_list_parsers(crawler, list_raw)
+    check_detail_extractors(crawler, detail_raw)
+
+    results = {}
+
+    # 列表页解析：解码后构建完整BeautifulSoup树 vs 原始字节lxml定向解析
+    list_html = list_raw.decode('gbk', errors='replace')
+    list_encoding = crawler._sniff_encoding(list_raw)
+    results['parse_list[bs4]'] = measure(
+        lambda: reference_parse_job_list(crawler, BeautifulSoup(list_html, 'lxml')), rounds
+    )
+    results['parse_list[lxml]'] = measure(lambda: crawler._parse_list_html(list_raw, list_encoding), rounds)
+
+    # 详情页提取：解码后构建完整BeautifulSoup树多次查找 vs 原始字节lxml单次遍历，吞吐量即页/秒
+    detail_html = detail_raw.decode('gbk', errors='replace')
+    detail_encoding = crawler._sniff_encoding(detail_raw)
+    results['extract_details[bs4]'] = measure(
+        lambda: reference_extract_details(crawler, BeautifulSoup(detail_html, 'lxml')), rounds
+    )
+    results['extract_details[lxml]'] = measure(
+        lambda: crawler._extract_details_html(detail_raw, detail_encoding), rounds
+    )
+
+    # 列表页与详情页：用示例页面代替网络响应，测量完整的解析路径
+    crawler._fetch = lambda url, headers=None, delay=None, kind='page': OfflineResponse(list_raw)
+    list_jobs = crawler.extract_job_list()
+    results['extract_job_list'] = measure(crawler.extract_job_list, rounds)
+
+    crawler._fetch = lambda url, headers=None, delay=None, kind='page': OfflineResponse(detail_raw)
+    detail_job = crawler.get_job_details(dict(list_jobs[0]))
+    results['get_job_details'] = measure(lambda: crawler.get_job_details(dict(list_jobs[0])), rounds)
+
+    # 命中原始页面缓存时的详情获取（读取压缩页面 + 解析）
+    crawler.page_cache = PageCache(os.path.join(os.path.dirname(crawler.data_file), 'page_cache'))
+    crawler.get_job_details(dict(list_jobs[0]))
+    results['get_job_details[cached]'] = measure(lambda: crawler.get_job_details(dict(list_jobs[0])), rounds)
+    crawler.page_cache.close()
+    crawler.page_cache = None
+
+    results['format_job_details_markdown'] = measure(
+        lambda: crawler._format_job_details_markdown(detail_job), rounds * 10
+    )
+
+    # 新职位检测与历史保存：列表页中有5个新职位，其余已在历史中
+    new_count = 5
+    for size in sizes:
+        history = synthetic_history(size, detail_job)
+        for job in list_jobs[new_count:]:
+            history[job['id']] = dict(detail_job, **job)
+
+        def reset_history():
+            crawler.jobs_history.clear()
+            crawler.jobs_history.update(history)
+
+        results[f'check_new_jobs[{size}]'] = measure(
+            lambda: crawler.check_new_jobs(list_jobs), rounds, items=len(list_jobs), setup=reset_history
+        )
+
+        # 历史保存：已持久化size条历史后，保存一次运行新增的职位
+        new_jobs = [dict(detail_job, **job) for job in list_jobs[:new_count]]
+
+        def prepare_save():
+            reset_history()
+            crawler._save_history()
+            for job in new_jobs:
+                crawler.jobs_history[job['id']] = job
+
+        # 大规模历史的准备工作（整体写入）很慢，减少重复次数
+        save_rounds = min(rounds, 3) if size >= 100000 else rounds
+        results[f'save_history[{size}]'] = measure(
+            crawler._save_history, save_rounds, items=new_count, setup=prepare_save
+        )
+
+        # 启动时加载历史记录（JSON存储只读取ID索引）
+        results[f'load_history[{size}]'] = measure(crawler._load_history, rounds, items=size)
+
+    results['save_jobs_backup'] = measure(lambda: crawler._save_jobs_backup(new_jobs), rounds, items=new_count)
+
+    return results
+
+
+def git_revision() -> Optional[str]:
+    """当前代码的git提交，用于区分不同版本的测试结果"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def print_results(results: Dict, baseline: Optional[Dict] = None):
+    """打印测试结果，提供baseline时显示p50相对变化"""
+    print(f"\n{'阶段':<32}{'p50(ms)':>10}{'p99(ms)':>10}{'吞吐量(/s)':>14}{'内存峰值(KB)':>14}{'p50变化':>10}")
+    print("-" * 92)
+    for name, stats in results.items():
+        change = ''
+        if baseline and name in baseline and baseline[name]['p50_ms']:
+            delta = (stats['p50_ms'] - baseline[name]['p50_ms']) / baseline[name]['p50_ms'] * 100
+            change = f"{delta:+.1f}%"
+        print(f"{name:<32}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['throughput']:>14.1f}{stats['peak_kb']:>14.0f}{change:>10}")
+
+
+def print_speedups(results: Dict):
+    """打印BeautifulSoup参考解析（[bs4]）与lxml解析（[lxml]）的p50提速和内存峰值对比"""
+    for name, full in results.items():
+        if not name.endswith('[bs4]'):
+            continue
+        fast = results.get(name[:-len('[bs4]')] + '[lxml]')
+        if not fast or not fast['p50_ms']:
+            continue
+        print(f"{name[:-len('[bs4]')]}: lxml比BeautifulSoup快 {full['p50_ms'] / fast['p50_ms']:.1f}x，"
+              f"内存峰值 {full['peak_kb']:.0f} KB → {fast['peak_kb']:.0f} KB")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='爬虫性能基准测试')
+    parser.add_argument('--rounds', type=int, default=20, help='每项测试的重复次数')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='合成历史数据规模，逗号分隔')
+    parser.add_argument('--output', help='将结果保存为JSON文件')
+    parser.add_argument('--compare', help='与之前保存的JSON结果比较')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix='bank-crawler-bench-')
+    crawler = create_crawler(work_dir)
+    print("🏁 爬虫性能基准测试")
+    print("=" * 50)
+    print("注: 内存峰值由tracemalloc统计，只包含Python对象，不含lxml内部分配")
+
+    try:
+        results = run_benchmarks(crawler, args.rounds, sizes)
+    finally:
+        crawler.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        baseline = previous['results']
+        print(f"\n对比基准: {previous.get('revision') or '未知版本'} ({previous.get('timestamp')})")
+
+    print_results(results, baseline)
+    print()
+    print_speedups(results)
+
+    if args.output:
+        report = {
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'rounds': args.rounds,
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,30 +10,174 @@
 4. 支持定时任务运行
 """
 
+import io
 import os
+import re
+import codecs
+import argparse
 import json
+import hashlib
+import difflib
 import time
 import logging
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+import metrics
+from logging_setup import setup_logging_from_env
+from history_store import create_history_store
+from notification_outbox import NotificationOutbox, recipient_id
+from page_cache import PageCache
+from run_report import RunReport
+from run_state import RUN_STATE
+
 # 加载环境变量
 load_dotenv()
 
+# 未配置LIST_URL时抓取的列表页
+DEFAULT_LIST_URL = 'http://www.yinhangzhaopin.com/tag/shehuizhaopin_13698_1.html'
+# 列表页中可以看到的职位字段，用于生成更新事件
+LIST_FIELDS = ('title', 'company', 'location', 'date_info', 'url')
+# 计算列表信息指纹的字段：公司、地点和日期都从标题中解析，链接只随站点地址变化（职位ID取自链接文件名），
+# 都不计入指纹，避免站点迁移或解析规则调整时把所有已知职位判定为已修改
+FINGERPRINT_FIELDS = ('title',)
+LIST_FIELD_LABELS = {'title': '标题', 'company': '公司', 'location': '地点', 'date_info': '日期', 'url': '链接'}
+# 更新通知中详情差异的最大行数
+UPDATE_DIFF_MAX_LINES = 40
+# 汇总通知的推送标题和正文标题行：new为新职位，update为职位更新
+DIGEST_TITLES = {'new': "🆕 新增 {count} 个职位", 'update': "🔄 更新 {count} 个职位"}
+DIGEST_HEADERS = {'new': "# 📮 新职位汇总 第 {page}/{pages} 页", 'update': "# 📮 职位更新汇总 第 {page}/{pages} 页"}
+
+# 备份日志分段文件名，以及每次运行写入的内容块标题
+BACKUP_SEGMENT_PATTERN = re.compile(r'^jobs_backup\.(\d+)\.log$')
+BACKUP_BLOCK_HEADER = re.compile(r'^=== 更新时间: .* ===$', re.MULTILINE)
+BACKUP_LEGACY_NAME = 'jobs_backup.legacy.txt'
+
+# 详情内容区域的查找顺序：优先div.newstxt，其次是其他常见的内容容器
+DETAIL_CONTENT_XPATHS = [
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' newstxt ')]",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' content ')]",
+    "//div[@id='content']",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' article-content ')]",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' job-content ')]",
+]
+# BeautifulSoup的get_text()不包含这些标签内的文本，提取详情时同样跳过，与benchmark.py中的参考解析结果一致
+DETAIL_TEXTLESS_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+# 页面编码检测：HTTP响应头中的charset，以及页面开头<meta>中声明的charset
+HEADER_CHARSET_PATTERN = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+# GB2312/GBK均为GB18030的子集，统一按GB18030解码以兼容扩展字符
+ENCODING_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'x-gbk': 'gb18030'}
+
+class HostThrottle:
+    """按主机限制并发数与请求间隔（礼貌抓取）"""
+    
+    def __init__(self, max_concurrency: int = 2, min_interval: float = 1.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+    
+    @contextmanager
+    def slot(self, url: str):
+        """占用目标主机的一个请求名额，保证同一主机的请求启动间隔不小于min_interval"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency)
+                self._semaphores[host] = semaphore
+        
+        semaphore.acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._next_slot.get(host, 0.0))
+                self._next_slot[host] = start_at + self.min_interval
+            if start_at > now:
+                time.sleep(start_at - now)
+            yield
+        finally:
+            semaphore.release()
+
+class TokenBucket:
+    """令牌桶限速：每秒补充rate个令牌，最多积累capacity个，rate<=0时不限速"""
+    
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """取得一个令牌，令牌不足时等待"""
+        if self.rate <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        
+        if wait > 0:
+            time.sleep(wait)
+
 class BankJobCrawler:
     """银行招聘信息爬虫类"""
     
     def __init__(self):
         self.base_url = os.getenv('BASE_URL', 'http://www.yinhangzhaopin.com')
-        self.list_url = os.getenv('LIST_URL', 'http://www.yinhangzhaopin.com/tag/shehuizhaopin_13698_1.html')
+        # 列表页来源：支持逗号或空白分隔的多个标签/分类页，并发抓取后合并去重
+        # 留空（例如 LIST_URL=）时与未设置相同
+        list_url_str = os.getenv('LIST_URL') or DEFAULT_LIST_URL
+        self.list_urls = [url for url in re.split(r'[,\s]+', list_url_str) if url] or [DEFAULT_LIST_URL]
+        self.list_url = self.list_urls[0]
         self.data_file = os.getenv('DATA_FILE', 'data/jobs_history.json')
+        # 历史记录存储：json（默认）或sqlite，使用sqlite时首次启动会自动从DATA_FILE迁移
+        self.history_backend = os.getenv('HISTORY_BACKEND', 'json')
+        self.history_db_file = os.getenv('HISTORY_DB_FILE', 'data/jobs_history.db')
+        # JSON存储的ID索引文件（检测新职位时只加载ID），设为空字符串则每次启动解析完整JSON
+        self.history_index_file = os.getenv('HISTORY_INDEX_FILE', 'data/jobs_history.ids')
+        # SQLite存储是否用布隆过滤器前置判断新职位
+        self.history_bloom = os.getenv('HISTORY_BLOOM', 'false').lower() == 'true'
+        # 已知职位的变化检测：列表信息变化或在最近发布窗口（小时）内的职位重新抓取详情
+        self.change_detection = os.getenv('CHANGE_DETECTION', 'true').lower() == 'true'
+        self.recheck_window_hours = float(os.getenv('RECHECK_WINDOW_HOURS', '0'))
+        self.notify_updates = os.getenv('NOTIFY_UPDATES', 'false').lower() == 'true'
         self.backup_file = os.getenv('BACKUP_FILE', 'data/jobs_backup.txt')
+        # 备份日志：每次运行只追加新职位，超过分段大小后切换到新文件；BACKUP_FILE为导出的可读视图
+        self.backup_log_dir = os.getenv('BACKUP_LOG_DIR', 'data/backup_log')
+        self.backup_segment_size = int(os.getenv('BACKUP_SEGMENT_SIZE', str(1024 * 1024)))
         self.log_file = os.getenv('LOG_FILE', 'logs/crawler.log')
+        # 运行报告：各阶段耗时和每个HTTP请求的明细，每次运行后覆盖写入，设为空字符串可禁用
+        self.run_report_file = os.getenv('RUN_REPORT_FILE', 'data/run_report.json')
+        self.report: Optional[RunReport] = None
+        self.last_report: Optional[Dict] = None
+        # 列表页条件请求缓存（ETag/Last-Modified/内容哈希），设为空字符串可禁用
+        self.list_cache_file = os.getenv('LIST_CACHE_FILE', 'data/list_cache.json')
+        # 列表翻页配置：最多抓取的页数，以及并发抓取后续页面的线程数
+        self.list_max_pages = max(1, int(os.getenv('LIST_MAX_PAGES', '1')))
+        self.list_page_workers = max(1, int(os.getenv('LIST_PAGE_WORKERS', '1')))
+        # 同时抓取的列表来源数
+        self.list_source_workers = max(1, int(os.getenv('LIST_SOURCE_WORKERS', '4')))
+        self.source_stats: Dict[str, Dict] = {}
         # 支持多个Server酱密钥
         server_chan_keys_str = os.getenv('SERVER_CHAN_KEY', '')
         if server_chan_keys_str:
@@ -48,10 +192,55 @@ class BankJobCrawler:
         else:
             self.server_chan_keys = []
         
+        # Server酱接口地址，可指向本地模拟服务用于测试
+        self.server_chan_api = os.getenv('SERVER_CHAN_API', 'https://sctapi.ftqq.com').rstrip('/')
+        
+        # 通知推送配置：并发推送的接收者数量，以及每个密钥的限速（条/秒）和突发容量
+        self.notify_workers = max(1, int(os.getenv('NOTIFY_WORKERS', '4')))
+        notify_rate = float(os.getenv('NOTIFY_RATE', '2'))
+        notify_burst = float(os.getenv('NOTIFY_BURST', '1'))
+        self._notify_buckets = {key: TokenBucket(notify_rate, notify_burst) for key in self.server_chan_keys}
+        # 发件箱只保存密钥的哈希，发送时按哈希找回密钥
+        self._outbox_recipients = {recipient_id(key): key for key in self.server_chan_keys}
+        # 通知发件箱：启用后通知先持久化，由后台线程发送并按指数退避重试
+        self.outbox_file = os.getenv('NOTIFY_OUTBOX_FILE', 'data/outbox.db')
+        self.outbox_enabled = os.getenv('NOTIFY_OUTBOX', 'false').lower() in ('1', 'true', 'yes')
+        self.outbox_poll_interval = float(os.getenv('NOTIFY_OUTBOX_POLL_INTERVAL', '10'))
+        self.outbox_flush_timeout = float(os.getenv('NOTIFY_OUTBOX_FLUSH_TIMEOUT', '120'))
+        self.outbox_max_attempts = int(os.getenv('NOTIFY_OUTBOX_MAX_ATTEMPTS', '8'))
+        
+        # 汇总推送：新职位数达到阈值时合并推送（0为关闭），每条汇总的最大职位数和最大字节数
+        self.digest_threshold = int(os.getenv('NOTIFY_DIGEST_THRESHOLD', '0'))
+        self.digest_size = max(1, int(os.getenv('NOTIFY_DIGEST_SIZE', '10')))
+        self.digest_max_bytes = int(os.getenv('NOTIFY_DIGEST_MAX_BYTES', '30000'))
+        
         # 请求配置
         self.request_delay = float(os.getenv('REQUEST_DELAY', '1'))
         self.timeout = int(os.getenv('TIMEOUT', '30'))
         self.retry_times = int(os.getenv('RETRY_TIMES', '3'))
+        # 页面未声明编码时使用的默认编码
+        self.default_encoding = os.getenv('DEFAULT_ENCODING', 'gbk')
+        # 按 主机/一级路径 缓存检测到的页面编码，后续页面无需再检测
+        self._encoding_cache = {}
+        # 详情页原始HTML缓存（压缩、按内容哈希存储），留空则禁用
+        self.page_cache_dir = os.getenv('PAGE_CACHE_DIR', '')
+        self.page_cache_max_mb = float(os.getenv('PAGE_CACHE_MAX_MB', '200'))
+        self.page_cache_max_age_days = float(os.getenv('PAGE_CACHE_MAX_AGE_DAYS', '30'))
+        
+        # 详情页并发配置（DETAIL_WORKERS=1 时保持顺序抓取）
+        self.detail_workers = max(1, int(os.getenv('DETAIL_WORKERS', '1')))
+        self.host_throttle = HostThrottle(
+            max_concurrency=int(os.getenv('HOST_MAX_CONCURRENCY', '2')),
+            # 留空（例如 HOST_REQUEST_INTERVAL=）时与未设置相同
+            min_interval=float(os.getenv('HOST_REQUEST_INTERVAL') or self.request_delay)
+        )
+        
+        # 连接池配置：POOL_CONNECTIONS为缓存的主机连接池数量，POOL_MAXSIZE为每个主机的最大连接数
+        self.pool_connections = int(os.getenv('POOL_CONNECTIONS', '10'))
+        # 留空（例如 POOL_MAXSIZE=）时与未设置相同
+        self.pool_maxsize = int(
+            os.getenv('POOL_MAXSIZE') or max(self.host_throttle.max_concurrency, self.detail_workers, self.notify_workers)
+        )
         
         # 设置请求头
         self.headers = {
@@ -63,6 +252,9 @@ class BankJobCrawler:
             'Upgrade-Insecure-Requests': '1',
         }
         
+        # 列表、详情和通知请求共用的长连接会话
+        self.session = self._create_session()
+        
         # 初始化日志
         self._setup_logging()
         
@@ -71,146 +263,423 @@ class BankJobCrawler:
         
         # 加载历史数据
         self.jobs_history = self._load_history()
+        
+        # 通知发件箱
+        self.outbox = NotificationOutbox(self.outbox_file, max_attempts=self.outbox_max_attempts) if self.outbox_enabled else None
+        self._outbox_thread = None
+        self._outbox_stop = threading.Event()
+        self._outbox_wakeup = threading.Event()
+        self.list_cache = self._load_list_cache()
+        
+        # 详情页原始HTML缓存
+        self.page_cache = PageCache(
+            self.page_cache_dir,
+            max_bytes=int(self.page_cache_max_mb * 1024 * 1024),
+            max_age_days=self.page_cache_max_age_days
+        ) if self.page_cache_dir else None
+        self._list_cache_lock = threading.Lock()
     
     def _setup_logging(self):
-        """设置日志配置"""
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        """设置日志配置：日志经队列由后台线程写入轮转的日志文件和控制台，重复创建爬虫实例时复用同一组处理器"""
+        # 日志级别和轮转配置见logging_setup.setup_logging_from_env
+        setup_logging_from_env()
         self.logger = logging.getLogger(__name__)
     
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的HTTP会话，复用TCP连接"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True  # 每个主机的连接数不超过pool_maxsize
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def get_connection_stats(self) -> Dict:
+        """统计连接池的请求数、新建连接数和复用次数"""
+        stats = {'requests': 0, 'new_connections': 0, 'reused': 0, 'hosts': {}}
+        
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = {
+                    'requests': pool.num_requests,
+                    'new_connections': pool.num_connections,
+                    'reused': max(0, pool.num_requests - pool.num_connections)
+                }
+                stats['hosts'][f"{pool.scheme}://{pool.host}:{pool.port}"] = host_stats
+                for field, value in host_stats.items():
+                    stats[field] += value
+        
+        return stats
+    
+    def close(self):
+        """停止发件箱后台线程，关闭HTTP会话、历史记录存储、发件箱和页面缓存
+        
+        发件箱后台线程在当前消息发送完后停止，发件箱在其结束后才关闭，不会重复发送已成功的消息
+        """
+        if self._outbox_thread is not None:
+            self._outbox_stop.set()
+            self._outbox_wakeup.set()
+            self._outbox_thread.join(timeout=30)
+        if self.outbox:
+            self.outbox.close()
+        self.session.close()
+        self.jobs_history.close()
+        if self.page_cache:
+            self.page_cache.close()
+    
     def _create_directories(self):
         """创建必要的目录"""
         os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
         os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        for path in (self.list_cache_file, self.history_db_file, self.history_index_file, self.outbox_file,
+                     self.run_report_file):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
     
-    def _load_history(self) -> Dict:
-        """加载历史数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.logger.error(f"加载历史数据失败: {e}")
-                return {}
-        return {}
+    def _load_history(self):
+        """加载历史数据，返回以职位ID为键的历史记录存储"""
+        return create_history_store(
+            self.history_backend, self.data_file, self.history_db_file,
+            index_file=self.history_index_file, bloom=self.history_bloom
+        )
     
     def _save_history(self):
         """保存历史数据"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.jobs_history, f, ensure_ascii=False, indent=2)
+            self.jobs_history.save()
         except Exception as e:
             self.logger.error(f"保存历史数据失败: {e}")
     
-    def _save_jobs_backup(self, new_jobs: List[Dict]):
-        """保存新职位到备份文件（新内容在顶部）"""
-        if not new_jobs:
+    def _evict_page_cache(self):
+        """淘汰过期或超出大小上限的缓存页面，出错时只记录警告，不影响本次运行"""
+        try:
+            evicted = self.page_cache.evict()
+        except Exception as e:
+            self.logger.warning(f"页面缓存淘汰失败，下次运行时重试: {e}")
             return
+        if evicted['pages']:
+            self.logger.info(f"页面缓存淘汰 {evicted['pages']} 个页面，删除 {evicted['blobs']} 个文件")
+    
+    def _backup_segments(self) -> List[str]:
+        """按时间顺序（从旧到新）返回备份日志分段文件"""
+        if not os.path.isdir(self.backup_log_dir):
+            return []
+        names = [name for name in os.listdir(self.backup_log_dir) if BACKUP_SEGMENT_PATTERN.match(name)]
+        return [os.path.join(self.backup_log_dir, name) for name in sorted(names)]
+    
+    def _migrate_legacy_backup(self):
+        """将旧的整文件备份（新内容在顶部）移入备份日志目录，导出时作为最早的内容"""
+        legacy_file = os.path.join(self.backup_log_dir, BACKUP_LEGACY_NAME)
+        if os.path.exists(self.backup_file) and not os.path.exists(legacy_file) and not self._backup_segments():
+            os.replace(self.backup_file, legacy_file)
+            self.logger.warning(
+                f"旧备份文件已移动到: {legacy_file}，之后新职位追加到 {self.backup_log_dir}，"
+                f"{self.backup_file} 不再自动更新，可用 python crawler.py --export-backup 导出"
+            )
+    
+    def _format_backup_block(self, new_jobs: List[Dict]) -> str:
+        """格式化一次运行新增职位的备份内容"""
+        new_content_lines = []
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        try:
-            # 读取现有内容
-            existing_content = ""
-            if os.path.exists(self.backup_file):
-                with open(self.backup_file, 'r', encoding='utf-8') as f:
-                    existing_content = f.read()
-            
-            # 格式化新职位信息
-            new_content_lines = []
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            new_content_lines.append(f"=== 更新时间: {current_time} ===")
-            new_content_lines.append(f"新增职位数量: {len(new_jobs)}")
+        new_content_lines.append(f"=== 更新时间: {current_time} ===")
+        new_content_lines.append(f"新增职位数量: {len(new_jobs)}")
+        new_content_lines.append("")
+        
+        for i, job in enumerate(new_jobs, 1):
+            new_content_lines.append(f"【职位 {i}】")
+            new_content_lines.append(f"标题: {job.get('title', '未知')}")
+            new_content_lines.append(f"公司: {job.get('company', '未知')}")
+            new_content_lines.append(f"地点: {job.get('location', '未知')}")
+            new_content_lines.append(f"链接: {job.get('url', '未知')}")
             new_content_lines.append("")
             
-            for i, job in enumerate(new_jobs, 1):
-                new_content_lines.append(f"【职位 {i}】")
-                new_content_lines.append(f"标题: {job.get('title', '未知')}")
-                new_content_lines.append(f"公司: {job.get('company', '未知')}")
-                new_content_lines.append(f"地点: {job.get('location', '未知')}")
-                new_content_lines.append(f"链接: {job.get('url', '未知')}")
-                new_content_lines.append("")
-                
-                # 添加职位详情
-                details = job.get('details', '暂无详情')
-                if details and details != '暂无详情':
-                    new_content_lines.append("职位详情:")
-                    new_content_lines.append("-" * 50)
-                    new_content_lines.append(details)
-                    new_content_lines.append("-" * 50)
-                else:
-                    new_content_lines.append("职位详情: 暂无详情")
-                
-                new_content_lines.append("")
-                new_content_lines.append("=" * 80)
-                new_content_lines.append("")
+            # 添加职位详情
+            details = job.get('details', '暂无详情')
+            if details and details != '暂无详情':
+                new_content_lines.append("职位详情:")
+                new_content_lines.append("-" * 50)
+                new_content_lines.append(details)
+                new_content_lines.append("-" * 50)
+            else:
+                new_content_lines.append("职位详情: 暂无详情")
             
-            # 将新内容写入文件顶部
-            new_content = "\n".join(new_content_lines)
+            new_content_lines.append("")
+            new_content_lines.append("=" * 80)
+            new_content_lines.append("")
+        
+        return "\n".join(new_content_lines)
+    
+    def _save_jobs_backup(self, new_jobs: List[Dict]):
+        """将新职位追加到备份日志，当前分段超过BACKUP_SEGMENT_SIZE时切换到新分段"""
+        if not new_jobs:
+            return
+        
+        try:
+            os.makedirs(self.backup_log_dir, exist_ok=True)
+            self._migrate_legacy_backup()
             
-            # 如果有现有内容，在新内容后添加分隔符和现有内容
-            if existing_content.strip():
-                final_content = new_content + "\n" + existing_content
+            segments = self._backup_segments()
+            if segments and os.path.getsize(segments[-1]) < self.backup_segment_size:
+                segment = segments[-1]
             else:
-                final_content = new_content
+                number = int(BACKUP_SEGMENT_PATTERN.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+                segment = os.path.join(self.backup_log_dir, f"jobs_backup.{number:06d}.log")
             
-            # 写入文件
-            with open(self.backup_file, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+            with open(segment, 'a', encoding='utf-8') as f:
+                f.write(self._format_backup_block(new_jobs) + "\n")
             
-            self.logger.info(f"备份文件已更新: {self.backup_file}，新增 {len(new_jobs)} 个职位")
+            self.logger.info(f"备份日志已更新: {segment}，新增 {len(new_jobs)} 个职位")
             
         except Exception as e:
             self.logger.error(f"保存备份文件失败: {e}")
     
-    def _make_request(self, url: str, encoding: str = 'gbk') -> Optional[BeautifulSoup]:
-        """发送HTTP请求并返回BeautifulSoup对象"""
+    def iter_backup_blocks(self):
+        """按从新到旧的顺序逐个返回备份内容块，最后返回旧的整文件备份"""
+        for segment in reversed(self._backup_segments()):
+            with open(segment, 'r', encoding='utf-8') as f:
+                content = f.read()
+            starts = [match.start() for match in BACKUP_BLOCK_HEADER.finditer(content)]
+            for begin, end in reversed(list(zip(starts, starts[1:] + [len(content)]))):
+                yield content[begin:end][:-1]  # 去掉追加时添加的换行
+        
+        legacy_file = os.path.join(self.backup_log_dir, BACKUP_LEGACY_NAME)
+        if os.path.exists(legacy_file):
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy_content = f.read()
+            if legacy_content.strip():
+                yield legacy_content
+    
+    def export_backup(self, output_file: Optional[str] = None) -> str:
+        """导出新内容在顶部的可读备份文件，默认写入BACKUP_FILE"""
+        output_file = output_file or self.backup_file
+        os.makedirs(self.backup_log_dir, exist_ok=True)
+        self._migrate_legacy_backup()
+        
+        tmp_file = output_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for i, block in enumerate(self.iter_backup_blocks()):
+                if i:
+                    f.write("\n")
+                f.write(block)
+        os.replace(tmp_file, output_file)
+        
+        self.logger.info(f"备份文件已导出: {output_file}")
+        return output_file
+    
+    def _fetch(self, url: str, headers: Optional[Dict] = None, delay: Optional[float] = None,
+               kind: str = 'page') -> Optional[requests.Response]:
+        """发送HTTP GET请求（带重试），返回响应对象
+        
+        headers为附加请求头；delay为请求后的等待时间，默认使用REQUEST_DELAY，
+        并发抓取时传0，由host_throttle控制请求间隔；kind为监控指标中的URL类别（list/detail）；
+        运行期间每个请求（含重试）在运行报告中记录一条明细
+        """
+        if delay is None:
+            delay = self.request_delay
+        
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+        
+        status, size, latency = None, 0, 0.0
         for attempt in range(self.retry_times):
+            if attempt > 0:
+                metrics.HTTP_RETRIES.inc(kind=kind)
             try:
-                self.logger.info(f"请求URL: {url} (尝试 {attempt + 1}/{self.retry_times})")
-                response = requests.get(url, headers=self.headers, timeout=self.timeout)
-                response.encoding = encoding
+                self.logger.debug(f"请求URL: {url} (尝试 {attempt + 1}/{self.retry_times})")
+                status, size = None, 0
+                with self.host_throttle.slot(url):
+                    start = time.perf_counter()
+                    try:
+                        response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+                    finally:
+                        latency = time.perf_counter() - start
+                        metrics.HTTP_REQUEST_DURATION.observe(latency, kind=kind)
+                status, size = response.status_code, len(response.content)
+                metrics.HTTP_RESPONSE_BYTES.inc(size, kind=kind)
                 response.raise_for_status()
                 
-                soup = BeautifulSoup(response.text, 'lxml')
-                time.sleep(self.request_delay)  # 请求间隔
-                return soup
+                if self.report:
+                    self.report.record_request(url, kind, status, size, latency, attempt)
+                if delay > 0:
+                    time.sleep(delay)  # 请求间隔
+                return response
                 
             except Exception as e:
                 self.logger.warning(f"请求失败 (尝试 {attempt + 1}/{self.retry_times}): {e}")
                 if attempt < self.retry_times - 1:
                     time.sleep(2 ** attempt)  # 指数退避
                 else:
+                    metrics.HTTP_FAILURES.inc(kind=kind)
                     self.logger.error(f"请求最终失败: {url}")
+                    if self.report:
+                        self.report.record_request(url, kind, status, size, latency, attempt, error=str(e))
         
         return None
     
-    def extract_job_list(self) -> List[Dict]:
-        """提取招聘列表信息"""
-        soup = self._make_request(self.list_url)
-        if not soup:
-            return []
+    def _make_request(self, url: str, encoding: Optional[str] = None, delay: Optional[float] = None,
+                      headers: Optional[Dict] = None, kind: str = 'page') -> Optional[tuple]:
+        """发送HTTP请求并返回 (响应对象, 编码)，列表页和详情页都通过它请求，解析时直接使用原始字节
         
+        encoding为None时自动检测页面编码（按主机和路径缓存），304响应没有内容，编码为None
+        """
+        response = self._fetch(url, headers=headers, delay=delay, kind=kind)
+        if response is None:
+            return None
+        
+        if response.status_code == 304:
+            return response, encoding
+        return response, encoding or self._detect_encoding(url, response)
+    
+    def _record_parse(self, kind: str, seconds: float):
+        """记录一次页面解析的耗时（监控指标和运行报告）"""
+        metrics.PARSE_DURATION.observe(seconds, kind=kind)
+        if self.report:
+            self.report.add_timing(f"parse.{kind}", seconds)
+    
+    def _normalize_encoding(self, encoding: Optional[str]) -> Optional[str]:
+        """规范化编码名称，无法识别的编码返回None"""
+        if not encoding:
+            return None
+        try:
+            name = codecs.lookup(encoding).name
+        except LookupError:
+            return None
+        return ENCODING_ALIASES.get(name, name)
+    
+    def _sniff_encoding(self, content: bytes) -> Optional[str]:
+        """从BOM或页面开头的<meta>标签中检测编码"""
+        if content.startswith(codecs.BOM_UTF8):
+            return 'utf-8'
+        match = META_CHARSET_PATTERN.search(content[:4096])
+        if match:
+            return self._normalize_encoding(match.group(1).decode('ascii', errors='ignore'))
+        return None
+    
+    def _encoding_cache_key(self, url: str) -> str:
+        """编码缓存的键：主机 + 一级路径，例如列表页 /tag、各银行的详情页 /hbbank"""
+        parsed = urlparse(url)
+        parts = parsed.path.lstrip('/').split('/')
+        return f"{parsed.netloc}/{parts[0] if len(parts) > 1 else ''}"
+    
+    def _detect_encoding(self, url: str, response: requests.Response) -> str:
+        """确定页面编码：优先使用响应头声明，其次使用缓存，最后检测页面内容并缓存结果"""
+        match = HEADER_CHARSET_PATTERN.search(response.headers.get('Content-Type', ''))
+        encoding = self._normalize_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+        
+        key = self._encoding_cache_key(url)
+        encoding = self._encoding_cache.get(key)
+        if encoding:
+            return encoding
+        
+        encoding = self._sniff_encoding(response.content) or self._normalize_encoding(self.default_encoding) or 'gb18030'
+        self._encoding_cache[key] = encoding
+        self.logger.info(f"检测到页面编码: {key} -> {encoding}")
+        return encoding
+    
+    @staticmethod
+    def _parse_html(html, encoding: Optional[str] = None):
+        """用lxml解析HTML，html为字节时按encoding解码"""
+        if isinstance(html, bytes):
+            parser = lxml.html.HTMLParser(encoding=encoding)
+            return lxml.html.document_fromstring(html, parser=parser)
+        return lxml.html.document_fromstring(html)
+    
+    def _load_list_cache(self) -> Dict:
+        """加载列表页条件请求缓存"""
+        if self.list_cache_file and os.path.exists(self.list_cache_file):
+            try:
+                with open(self.list_cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                self.logger.warning(f"加载列表页缓存失败: {e}")
+        return {}
+    
+    def _save_list_cache(self):
+        """保存列表页条件请求缓存"""
+        if not self.list_cache_file:
+            return
+        try:
+            with open(self.list_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.list_cache, f, ensure_ascii=False)
+        except Exception as e:
+            self.logger.warning(f"保存列表页缓存失败: {e}")
+    
+    def _restore_cached_jobs(self, entry: Dict) -> List[Dict]:
+        """从缓存条目恢复上次解析出的职位列表"""
+        crawl_time = datetime.now().isoformat()
         jobs = []
+        for job in entry.get('jobs', []):
+            job = dict(job)
+            job['crawl_time'] = crawl_time
+            jobs.append(job)
+        return jobs
+    
+    def _fetch_list_page(self, url: str, delay: Optional[float] = None) -> Optional[List[Dict]]:
+        """获取并解析一个列表页，请求失败时返回None
+        
+        启用LIST_CACHE_FILE时发送If-None-Match/If-Modified-Since，
+        服务器返回304或页面内容哈希未变化时直接使用缓存的职位列表，跳过HTML解析
+        """
+        entry = self.list_cache.get(url) if self.list_cache_file else None
+        
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        result = self._make_request(url, delay=delay, headers=headers, kind='list')
+        if result is None:
+            return None
+        response, encoding = result
         
-        # 根据HTML结构提取职位信息
-        # 从示例HTML可以看出，职位链接在 <dt><a href="..." title="...">...</a></dt> 结构中
-        job_links = soup.find_all('dt')
+        if response.status_code == 304 and entry:
+            self.logger.info(f"列表页未修改 (304)，使用缓存: {url}")
+            return self._restore_cached_jobs(entry)
         
-        for dt in job_links:
-            link = dt.find('a')
-            if not link or not link.get('href'):
+        digest = hashlib.sha256(response.content).hexdigest()
+        if entry and entry.get('digest') == digest:
+            self.logger.info(f"列表页内容未变化，使用缓存: {url}")
+            jobs = self._restore_cached_jobs(entry)
+        else:
+            start = time.perf_counter()
+            jobs = self._parse_list_html(response.content, encoding)
+            self._record_parse('list', time.perf_counter() - start)
+        
+        if self.list_cache_file:
+            with self._list_cache_lock:
+                self.list_cache[url] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'digest': digest,
+                    'jobs': [dict(job) for job in jobs]
+                }
+                self._save_list_cache()
+        
+        return jobs
+    
+    def _parse_job_links(self, links) -> List[Dict]:
+        """根据(href, title)序列生成职位基本信息"""
+        jobs = []
+        
+        for href, title in links:
+            if not href:
                 continue
             
-            href = link.get('href')
-            title = link.get('title', '').strip()
+            title = (title or '').strip()
             
             # 跳过非职位链接
             if not href.endswith('.htm') or not title:
@@ -224,6 +693,132 @@ class BankJobCrawler:
             if job_info:
                 jobs.append(job_info)
         
+        return jobs
+    
+    def _parse_list_html(self, html, encoding: Optional[str] = None) -> List[Dict]:
+        """快速解析列表页：直接用lxml遍历<dt>中的第一个链接，不构建BeautifulSoup树
+        
+        html可以是字符串或原始字节（配合encoding），输出与benchmark.py中的BeautifulSoup参考解析完全一致
+        """
+        tree = self._parse_html(html, encoding)
+        links = []
+        for dt in tree.iter('dt'):
+            link = dt.find('.//a')
+            if link is not None:
+                links.append((link.get('href'), link.get('title', '')))
+        
+        return self._parse_job_links(links)
+    
+    def _list_page_urls(self, list_url: str) -> List[str]:
+        """生成需要抓取的列表页URL，例如 shehuizhaopin_13698_1.html -> _2.html、_3.html"""
+        match = re.match(r'^(.*_)(\d+)(\.html?)$', list_url)
+        if not match:
+            if self.list_max_pages > 1:
+                self.logger.warning(f"列表页URL不支持翻页，只抓取第一页: {list_url}")
+            return [list_url]
+        
+        prefix, first_page, suffix = match.group(1), int(match.group(2)), match.group(3)
+        return [f"{prefix}{page}{suffix}" for page in range(first_page, first_page + self.list_max_pages)]
+    
+    def _fetch_list_pages(self, urls: List[str]) -> List[Optional[List[Dict]]]:
+        """抓取一批列表页，多于一页时并发请求，结果顺序与urls一致"""
+        if len(urls) == 1:
+            return [self._fetch_list_page(urls[0])]
+        
+        with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='list') as executor:
+            return list(executor.map(lambda url: self._fetch_list_page(url, delay=0), urls))
+    
+    def _extract_source_jobs(self, list_url: str) -> Optional[List[Dict]]:
+        """提取一个列表来源的职位，第一页获取失败时返回None
+        
+        LIST_MAX_PAGES>1 时依次翻页，直到某一页出现已在历史记录中的职位ID为止；
+        第一页总是单独请求，没有积压时只需一次请求
+        """
+        page_urls = self._list_page_urls(list_url)
+        jobs = []
+        seen_ids = set()
+        
+        index = 0
+        while index < len(page_urls):
+            batch_size = 1 if index == 0 else self.list_page_workers
+            batch = page_urls[index:index + batch_size]
+            
+            stop = False
+            for page, (url, page_jobs) in enumerate(zip(batch, self._fetch_list_pages(batch)), index + 1):
+                if page_jobs is None:
+                    if page == 1:
+                        return None
+                    self.logger.warning(f"列表页获取失败，停止翻页: {url}")
+                    stop = True
+                    break
+                
+                for job in page_jobs:
+                    if job['id'] not in seen_ids:
+                        seen_ids.add(job['id'])
+                        jobs.append(job)
+                
+                if not page_jobs or any(job['id'] in self.jobs_history for job in page_jobs):
+                    stop = True
+                    break
+            
+            if stop:
+                break
+            index += batch_size
+        
+        return jobs
+    
+    def _extract_source_timed(self, list_url: str) -> tuple:
+        """提取一个列表来源的职位并计时，返回 (职位列表或None, 耗时, 错误信息)"""
+        start = time.perf_counter()
+        error = None
+        try:
+            jobs = self._extract_source_jobs(list_url)
+            if jobs is None:
+                error = '列表页获取失败'
+        except Exception as e:
+            jobs, error = None, str(e)
+        return jobs, time.perf_counter() - start, error
+    
+    def extract_job_list(self) -> List[Dict]:
+        """提取招聘列表信息
+        
+        配置了多个列表来源时并发抓取，一个来源慢或失败不影响其他来源；
+        结果按来源顺序合并，按职位ID去重，每个职位的sources记录它出现在哪些来源中
+        """
+        if len(self.list_urls) == 1:
+            results = [self._extract_source_timed(self.list_url)]
+        else:
+            workers = min(self.list_source_workers, len(self.list_urls))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='source') as executor:
+                results = list(executor.map(self._extract_source_timed, self.list_urls))
+        
+        jobs = []
+        jobs_by_id = {}
+        self.source_stats = {}
+        for list_url, (source_jobs, seconds, error) in zip(self.list_urls, results):
+            self.source_stats[list_url] = {
+                'ok': error is None,
+                'jobs': len(source_jobs or []),
+                'seconds': round(seconds, 3),
+                'error': error
+            }
+            metrics.SOURCE_DURATION.observe(seconds, source=list_url)
+            if error is not None:
+                metrics.SOURCE_FAILURES.inc(source=list_url)
+                self.logger.error(f"列表来源抓取失败: {list_url}, 耗时 {seconds:.2f} 秒, 错误: {error}")
+                continue
+            
+            self.logger.info(f"列表来源: {list_url}, {len(source_jobs)} 个职位, 耗时 {seconds:.2f} 秒")
+            for job in source_jobs:
+                existing = jobs_by_id.get(job['id'])
+                if existing is None:
+                    job['sources'] = [list_url]
+                    jobs_by_id[job['id']] = job
+                    jobs.append(job)
+                elif list_url not in existing['sources']:
+                    existing['sources'].append(list_url)
+        
+        RUN_STATE.set_sources(self.source_stats)
         self.logger.info(f"提取到 {len(jobs)} 个职位信息")
         return jobs
     
@@ -288,55 +883,106 @@ class BankJobCrawler:
             return filename.replace('.htm', '').replace('.html', '')
         return str(hash(url))
     
-    def get_job_details(self, job: Dict) -> Dict:
-        """获取职位详细信息"""
-        soup = self._make_request(job['url'])
-        if not soup:
+    @staticmethod
+    def _clean_details_text(text: str) -> str:
+        """清理详情纯文本：去除空行、分享和联系提示"""
+        lines = text.split('\n')
+        cleaned_lines = []
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('分享到:') and not line.startswith('联系我们时'):
+                cleaned_lines.append(line)
+        return '\n'.join(cleaned_lines)
+    
+    @staticmethod
+    def _is_detail_noise(element) -> bool:
+        """判断详情区域中需要移除的节点：脚本、广告、分享和免责声明"""
+        if element.tag == 'script':
+            return True
+        if element.tag != 'div':
+            return False
+        
+        classes = (element.get('class') or '').split()
+        return (
+            'yindao' in classes or 'zhezhao' in classes
+            or element.get('id') == 'ckepop'
+            or 'color:#666' in (element.get('style') or '')
+        )
+    
+    @classmethod
+    def _collect_detail_text(cls, element, pieces: List[str]):
+        """单次遍历收集元素内的文本，跳过需要移除的节点（保留其后的兄弟文本）"""
+        if element.text:
+            pieces.append(element.text)
+        
+        for child in element:
+            # 注释等非元素节点以及需要移除的节点只保留其后的文本
+            if isinstance(child.tag, str) and child.tag not in DETAIL_TEXTLESS_TAGS and not cls._is_detail_noise(child):
+                cls._collect_detail_text(child, pieces)
+            if child.tail:
+                pieces.append(child.tail)
+    
+    @classmethod
+    def _extract_details_html(cls, html, encoding: Optional[str] = None) -> Optional[str]:
+        """快速提取详情文本：用lxml定位内容区域，只遍历该子树一次
+        
+        html可以是字符串或原始字节（配合encoding），输出与benchmark.py中的BeautifulSoup参考解析完全一致，
+        找不到内容区域时返回None；不依赖实例状态，回填脚本的解析进程直接通过类调用
+        """
+        tree = cls._parse_html(html, encoding)
+        
+        for xpath in DETAIL_CONTENT_XPATHS:
+            matches = tree.xpath(xpath)
+            if matches:
+                content_div = matches[0]
+                break
+        else:
+            return None
+        
+        pieces = []
+        cls._collect_detail_text(content_div, pieces)
+        text = '\n'.join(piece.strip() for piece in pieces if piece.strip())
+        return cls._clean_details_text(text)
+    
+    def _load_detail_page(self, url: str, delay: Optional[float] = None, refresh: bool = False) -> Optional[tuple]:
+        """获取详情页的 (原始字节, 编码)
+        
+        启用PAGE_CACHE_DIR时优先返回缓存（不发送请求），refresh为True时总是重新请求；
+        请求到的页面写入缓存
+        """
+        if self.page_cache and not refresh:
+            cached = self.page_cache.get(url)
+            if cached is not None:
+                metrics.PAGE_CACHE.inc(result='hit')
+                content, encoding = cached
+                return content, encoding or self._sniff_encoding(content)
+            metrics.PAGE_CACHE.inc(result='miss')
+        
+        result = self._make_request(url, delay=delay, kind='detail')
+        if result is None:
+            return None
+        
+        response, encoding = result
+        if self.page_cache:
+            try:
+                self.page_cache.put(url, response.content, encoding)
+            except Exception as e:
+                self.logger.warning(f"写入页面缓存失败: {url}, 错误: {e}")
+        return response.content, encoding
+    
+    def get_job_details(self, job: Dict, delay: Optional[float] = None, refresh: bool = False) -> Dict:
+        """获取职位详细信息，refresh为True时跳过页面缓存"""
+        page = self._load_detail_page(job['url'], delay=delay, refresh=refresh)
+        if page is None:
             return job
         
         try:
-            # 提取职位详情内容
-            # 根据实际HTML结构，详情在class为'newstxt'的div中
-            content_div = soup.find('div', class_='newstxt')
-            
-            if not content_div:
-                # 尝试其他可能的选择器
-                content_div = soup.find('div', class_='content') or soup.find('div', {'id': 'content'})
-                if not content_div:
-                    content_div = soup.find('div', class_='article-content') or soup.find('div', class_='job-content')
-            
-            if content_div:
-                # 移除广告和无关内容
-                # 移除script标签
-                for script in content_div.find_all('script'):
-                    script.decompose()
-                
-                # 移除广告相关的div
-                for ad_div in content_div.find_all('div', class_=['yindao', 'zhezhao']):
-                    ad_div.decompose()
-                
-                # 移除分享相关内容
-                for share_div in content_div.find_all('div', {'id': 'ckepop'}):
-                    share_div.decompose()
-                
-                # 移除免责声明等
-                for disclaimer in content_div.find_all('div', style=lambda x: x and 'color:#666' in x):
-                    disclaimer.decompose()
-                
-                # 清理HTML标签，提取纯文本
-                details = content_div.get_text(separator='\n', strip=True)
-                
-                # 进一步清理文本
-                lines = details.split('\n')
-                cleaned_lines = []
-                for line in lines:
-                    line = line.strip()
-                    if line and not line.startswith('分享到:') and not line.startswith('联系我们时'):
-                        cleaned_lines.append(line)
-                
-                job['details'] = '\n'.join(cleaned_lines)
-            else:
-                job['details'] = '无法获取详细信息'
+            start = time.perf_counter()
+            details = self._extract_details_html(*page)
+            self._record_parse('detail', time.perf_counter() - start)
+            job['details'] = details if details is not None else '无法获取详细信息'
+            if details is not None:
+                job['details_hash'] = self._fingerprint(details)
             
             self.logger.info(f"获取职位详情成功: {job['title']}")
             
@@ -346,6 +992,44 @@ class BankJobCrawler:
         
         return job
     
+    def fetch_job_details(self, jobs: List[Dict], update_history: bool = True, refresh: bool = False):
+        """获取一批职位的详情，每完成一个即写回历史记录（update_history为False时不写回）
+        
+        refresh为True时跳过页面缓存，总是重新请求详情页
+        DETAIL_WORKERS>1 时使用线程池并发抓取，同一主机的并发数和请求间隔由host_throttle限制
+        """
+        if not jobs:
+            return
+        
+        RUN_STATE.set_progress(0, len(jobs))
+        RUN_STATE.set_queue('details', len(jobs))
+        
+        if self.detail_workers <= 1 or len(jobs) == 1:
+            for done, job in enumerate(jobs, 1):
+                self.get_job_details(job, refresh=refresh)
+                if update_history:
+                    self.jobs_history[job['id']] = job  # 更新历史记录
+                RUN_STATE.set_progress(done, len(jobs))
+                RUN_STATE.set_queue('details', len(jobs) - done)
+            return
+        
+        workers = min(self.detail_workers, len(jobs))
+        self.logger.info(f"并发获取 {len(jobs)} 个职位详情，线程数: {workers}")
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detail') as executor:
+            futures = {executor.submit(self.get_job_details, job, 0, refresh): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self.logger.error(f"获取职位详情失败: {job['title']}, 错误: {e}")
+                if update_history:
+                    self.jobs_history[job['id']] = job  # 更新历史记录
+                RUN_STATE.set_progress(done, len(jobs))
+                RUN_STATE.set_queue('details', len(jobs) - done)
+                self.logger.info(f"详情进度: {done}/{len(jobs)}")
+    
     def check_new_jobs(self, current_jobs: List[Dict]) -> List[Dict]:
         """检查新增的职位"""
         new_jobs = []
@@ -353,6 +1037,7 @@ class BankJobCrawler:
         for job in current_jobs:
             job_id = job['id']
             if job_id not in self.jobs_history:
+                job['list_hash'] = self._list_fingerprint(job)
                 new_jobs.append(job)
                 self.jobs_history[job_id] = job
         
@@ -363,6 +1048,101 @@ class BankJobCrawler:
         
         return new_jobs
     
+    def _fingerprint(self, text: str) -> str:
+        """计算文本指纹"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    
+    def _list_fingerprint(self, job: Dict) -> str:
+        """计算职位列表信息的指纹（见FINGERPRINT_FIELDS）"""
+        return self._fingerprint('\x1f'.join(str(job.get(field) or '') for field in FINGERPRINT_FIELDS))
+    
+    def _is_recent(self, crawl_time: str) -> bool:
+        """判断职位是否在最近发布窗口内（按首次发现时间）"""
+        if self.recheck_window_hours <= 0 or not crawl_time:
+            return False
+        try:
+            age = datetime.now() - datetime.fromisoformat(crawl_time)
+        except ValueError:
+            return False
+        return age.total_seconds() <= self.recheck_window_hours * 3600
+    
+    def check_updated_jobs(self, current_jobs: List[Dict], new_jobs: List[Dict]) -> List[Dict]:
+        """重新验证已知职位，返回更新事件 {'job', 'changes', 'diff'}
+        
+        只比较ID索引中的指纹：列表信息指纹变化或在RECHECK_WINDOW_HOURS窗口内的职位才重新抓取详情，
+        列表信息或详情指纹变化时合并到历史记录（保留首次发现时间）并生成更新事件
+        """
+        if not self.change_detection:
+            return []
+        
+        new_ids = {job['id'] for job in new_jobs}
+        candidates = []
+        for job in current_jobs:
+            if job['id'] in new_ids:
+                continue
+            stored = self.jobs_history.fingerprint(job['id'])
+            if stored is None:
+                continue
+            
+            job['list_hash'] = self._list_fingerprint(job)
+            if stored['list_hash'] != job['list_hash']:
+                # 旧版本保存的记录没有指纹或按旧规则计算，从记录本身重新计算基准指纹
+                old = self.jobs_history[job['id']]
+                stored['list_hash'] = self._list_fingerprint(old)
+                if stored['list_hash'] == job['list_hash']:
+                    # 不计入指纹的字段（例如迁移后的链接）直接跟随列表页，不生成更新事件
+                    current = {field: job.get(field) for field in LIST_FIELDS}
+                    self.jobs_history[job['id']] = dict(old, **current, list_hash=stored['list_hash'])
+            
+            if stored['list_hash'] != job['list_hash'] or self._is_recent(stored['crawl_time']):
+                candidates.append((job, stored))
+        
+        if not candidates:
+            return []
+        
+        self.logger.info(f"重新验证 {len(candidates)} 个已知职位的详情")
+        self.fetch_job_details([job for job, _ in candidates], update_history=False, refresh=True)
+        
+        updates = []
+        for job, stored in candidates:
+            list_changed = stored['list_hash'] != job['list_hash']
+            details_changed = 'details_hash' in job and job['details_hash'] != stored['details_hash']
+            if not list_changed and not details_changed:
+                continue
+            
+            old = self.jobs_history[job['id']]
+            if details_changed and not stored['details_hash'] and old.get('details'):
+                # 旧记录没有详情指纹，按保存的详情文本比较
+                details_changed = self._fingerprint(old['details']) != job['details_hash']
+                if not list_changed and not details_changed:
+                    self.jobs_history[job['id']] = dict(old, details_hash=job['details_hash'])
+                    continue
+            
+            changes = {
+                field: (old.get(field), job.get(field))
+                for field in LIST_FIELDS if old.get(field) != job.get(field)
+            }
+            diff = []
+            merged = dict(old)
+            merged.update({field: job.get(field) for field in LIST_FIELDS})
+            merged['list_hash'] = job['list_hash']
+            if 'details_hash' in job:
+                merged['details'] = job['details']
+                merged['details_hash'] = job['details_hash']
+            if details_changed:
+                diff = list(difflib.unified_diff(
+                    (old.get('details') or '').splitlines(), job['details'].splitlines(),
+                    fromfile='原详情', tofile='新详情', lineterm='', n=1
+                ))
+            merged['updated_time'] = datetime.now().isoformat()
+            self.jobs_history[job['id']] = merged
+            updates.append({'job': merged, 'changes': changes, 'diff': diff})
+        
+        if updates:
+            self.logger.info(f"发现 {len(updates)} 个职位信息更新")
+            metrics.UPDATED_JOBS_TOTAL.inc(len(updates))
+        return updates
+    
     def _format_job_details_markdown(self, job: Dict) -> str:
         """将职位详情格式化为markdown"""
         details = job.get('details', '暂无详细信息')
@@ -402,50 +1182,346 @@ class BankJobCrawler:
         
         return "\n".join(markdown_content)
     
-    def send_notification(self, new_jobs: List[Dict]):
-        """发送新职位通知"""
+    def _push_server_chan(self, server_chan_key: str, title: str, short: str, desp: str,
+                          kind: str = 'notify', retries: int = 0):
+        """调用Server酱接口推送一条消息，失败时抛出异常
+        
+        运行期间在运行报告中记录这次POST，URL中含有SendKey，只记录主机；
+        kind区分直接推送（notify）和发件箱发送（outbox），retries为之前已失败的次数
+        """
+        url = f"{self.server_chan_api}/{server_chan_key}.send"
+        data = {
+            'title': title,
+            'short': short,
+            'desp': desp
+        }
+        
+        # 发件箱在后台线程发送，运行结束时self.report会被置为None
+        report = self.report
+        status, size, error = None, 0, None
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, data=data, timeout=10)
+            status, size = response.status_code, len(response.content)
+            response.raise_for_status()
+        except Exception as e:
+            error = str(e).replace(server_chan_key, '***')
+            metrics.NOTIFICATION_FAILURES.inc()
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            metrics.NOTIFICATION_DURATION.observe(latency)
+            if report:
+                report.record_request(urlparse(url).netloc, kind, status, size, latency, retries,
+                                      error=error, method='POST')
+        metrics.NOTIFICATIONS_SENT.inc()
+    
+    def _send_to_recipient(self, index: int, server_chan_key: str, messages: List[tuple]) -> Dict:
+        """按顺序向一个接收者推送所有消息，受该密钥的令牌桶限速"""
+        result = {'sent': 0, 'failed': 0}
+        bucket = self._notify_buckets[server_chan_key]
+        
+        for _, title, short, desp in messages:
+            bucket.acquire()
+            try:
+                self._push_server_chan(server_chan_key, title, short, desp)
+                result['sent'] += 1
+                self.logger.info(f"通知发送成功 (接收者{index}): {title} - {short}")
+            except Exception as e:
+                result['failed'] += 1
+                self.logger.error(f"向接收者{index}发送通知失败: {title} - {e}")
+        
+        return result
+    
+    def _use_digest(self, count: int) -> bool:
+        """消息数达到NOTIFY_DIGEST_THRESHOLD时使用汇总推送（只有一条时总是单独推送）"""
+        return self.digest_threshold > 0 and count >= max(2, self.digest_threshold)
+    
+    def _build_notification_messages(self, new_jobs: List[Dict]) -> List[tuple]:
+        """构造所有接收者共用的 (message_id, title, short, desp) 消息列表
+        
+        新职位数达到NOTIFY_DIGEST_THRESHOLD时使用汇总推送，否则（包括只有一个新职位时）每个职位单独推送
+        """
+        if self._use_digest(len(new_jobs)):
+            return self._build_digest_messages(new_jobs)
+        
+        return [
+            (
+                job['id'],
+                job.get('title', '未知职位'),             # title: 对应爬取到的title
+                job.get('location', '未知地区'),          # short: 对应爬取到的location
+                self._format_job_details_markdown(job)    # desp: 格式化的岗位详情
+            )
+            for job in new_jobs
+        ]
+    
+    def _digest_header(self, page: int, pages: int, kind: str = 'new') -> str:
+        """汇总通知正文的标题行"""
+        return DIGEST_HEADERS[kind].format(page=page, pages=pages)
+    
+    def _render_digest(self, batch: List[tuple], page: int, pages: int, kind: str = 'new') -> str:
+        """渲染一条汇总通知的正文：标题、职位概要和每个职位的详情"""
+        desp_lines = [
+            self._digest_header(page, pages, kind), "",
+            self._format_notification_content([job for job, _, _ in batch])
+        ]
+        for _, _, markdown in batch:
+            desp_lines.extend(["", "---", "", markdown])
+        return "\n".join(desp_lines)
+    
+    def _truncate_utf8(self, text: str, max_bytes: int) -> str:
+        """按UTF-8字节数截断文本（不截断半个字符），被截断时追加提示"""
+        data = text.encode('utf-8')
+        if len(data) <= max_bytes:
+            return text
+        notice = "\n\n……（内容过长，已截断）"
+        keep = max(0, max_bytes - len(notice.encode('utf-8')))
+        return data[:keep].decode('utf-8', errors='ignore') + notice
+    
+    def _build_digest_messages(self, new_jobs: List[Dict], kind: str = 'new',
+                               entries: Optional[List[tuple]] = None) -> List[tuple]:
+        """将新职位（或更新事件）分批汇总，每批不超过NOTIFY_DIGEST_SIZE个职位，完整正文不超过NOTIFY_DIGEST_MAX_BYTES字节
+        
+        entries为每个职位的 (message_id, markdown)，默认为职位ID和职位详情；
+        字节预算包括标题行和职位概要（标题行按最大页码计算），单个职位的详情超出预算时截断
+        """
+        if entries is None:
+            entries = [(job['id'], self._format_job_details_markdown(job)) for job in new_jobs]
+        
+        # 页数不会超过职位数，按最长的页码估算标题行
+        header_bytes = len(self._digest_header(len(new_jobs), len(new_jobs), kind).encode('utf-8'))
+        separator_bytes = len("\n\n---\n\n".encode('utf-8'))
+        
+        def fixed_bytes(jobs: List[Dict]) -> int:
+            return header_bytes + 2 + len(self._format_notification_content(jobs).encode('utf-8'))
+        
+        batches = []
+        batch, batch_bytes = [], 0
+        for job, (item_id, markdown) in zip(new_jobs, entries):
+            budget = self.digest_max_bytes - fixed_bytes([job]) - separator_bytes
+            markdown = self._truncate_utf8(markdown, budget)
+            size = separator_bytes + len(markdown.encode('utf-8'))
+            if batch and (
+                len(batch) >= self.digest_size
+                or fixed_bytes([item[0] for item in batch] + [job]) + batch_bytes + size > self.digest_max_bytes
+            ):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append((job, item_id, markdown))
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        
+        messages = []
+        for page, batch in enumerate(batches, 1):
+            jobs = [job for job, _, _ in batch]
+            
+            title = DIGEST_TITLES[kind].format(count=len(new_jobs))
+            if len(batches) > 1:
+                title += f" ({page}/{len(batches)})"
+            
+            locations = []
+            for job in jobs:
+                location = job.get('location', '未知地区')
+                if location not in locations:
+                    locations.append(location)
+            short = '、'.join(locations)[:64]
+            
+            batch_ids = ','.join(item_id for _, item_id, _ in batch)
+            prefix = 'digest' if kind == 'new' else f'{kind}-digest'
+            message_id = f"{prefix}:{hashlib.sha1(batch_ids.encode('utf-8')).hexdigest()[:16]}"
+            messages.append((message_id, title, short, self._render_digest(batch, page, len(batches), kind)))
+        
+        self.logger.info(f"汇总推送: {len(new_jobs)} 个职位合并为 {len(messages)} 条通知")
+        return messages
+    
+    def send_notification(self, new_jobs: List[Dict]) -> Optional[Dict]:
+        """发送新职位通知
+        
+        不同接收者并发推送，同一接收者按职位顺序推送并受令牌桶限速，
+        返回发送成功数、失败数和总耗时；启用发件箱时入队失败会抛出异常
+        """
         if not new_jobs or not self.server_chan_keys:
             if not self.server_chan_keys:
                 self.logger.warning("未配置Server酱密钥，跳过通知发送")
-            return
+            return None
         
         self.logger.info(f"准备向 {len(self.server_chan_keys)} 个接收者发送通知")
         
         try:
-            # 为每个新职位发送单独的通知
-            for job in new_jobs:
-                # 构造通知内容
-                title = job.get('title', '未知职位')      # title: 对应爬取到的title
-                short = job.get('location', '未知地区')  # short: 对应爬取到的location
-                desp = self._format_job_details_markdown(job)  # desp: 格式化的岗位详情
-                
-                # 向每个配置的密钥发送通知
-                for i, server_chan_key in enumerate(self.server_chan_keys, 1):
-                    try:
-                        # 发送Server酱通知
-                        url = f"https://sctapi.ftqq.com/{server_chan_key}.send"
-                        data = {
-                            'title': title,
-                            'short': short,
-                            'desp': desp
-                        }
-                        
-                        response = requests.post(url, data=data, timeout=10)
-                        response.raise_for_status()
-                        
-                        self.logger.info(f"通知发送成功 (接收者{i}): {title} - {short}")
-                        
-                    except Exception as e:
-                        self.logger.error(f"向接收者{i}发送通知失败: {title} - {e}")
-                    
-                    # 避免频繁请求，添加延迟
-                    time.sleep(0.5)
-                
-                # 每个职位发送完成后稍作延迟
-                time.sleep(1)
-            
+            # 每个职位只构造一次通知内容
+            return self._deliver_messages(self._build_notification_messages(new_jobs))
         except Exception as e:
             self.logger.error(f"发送通知过程中出现错误: {e}")
+            if self.outbox:
+                raise
+            return None
+    
+    def send_update_notification(self, updates: List[Dict]) -> Optional[Dict]:
+        """发送职位信息更新通知：更新数达到NOTIFY_DIGEST_THRESHOLD时汇总推送，否则每个更新事件一条消息
+        
+        启用发件箱时入队失败会抛出异常
+        """
+        if not updates or not self.server_chan_keys or not self.notify_updates:
+            return None
+        
+        self.logger.info(f"准备向 {len(self.server_chan_keys)} 个接收者发送 {len(updates)} 条更新通知")
+        
+        try:
+            return self._deliver_messages(self._build_update_messages(updates))
+        except Exception as e:
+            self.logger.error(f"发送更新通知过程中出现错误: {e}")
+            if self.outbox:
+                raise
+            return None
+    
+    def _build_update_messages(self, updates: List[Dict]) -> List[tuple]:
+        """构造所有接收者共用的更新消息列表，更新数达到NOTIFY_DIGEST_THRESHOLD时汇总推送"""
+        if not self._use_digest(len(updates)):
+            return [self._build_update_message(update) for update in updates]
+        
+        # 汇总正文中每个职位的更新以职位标题开头
+        entries = [
+            (self._update_message_id(update['job']),
+             self._format_update_markdown(update, f"## 🔄 {update['job'].get('title', '未知职位')}"))
+            for update in updates
+        ]
+        return self._build_digest_messages([update['job'] for update in updates], kind='update', entries=entries)
+    
+    def _update_message_id(self, job: Dict) -> str:
+        """更新消息的ID，包含新版本的指纹以便去重"""
+        return f"{job['id']}:update:{job.get('list_hash', '')}:{job.get('details_hash', '')}"
+    
+    def _format_update_markdown(self, update: Dict, heading: str = "## 🔄 职位信息更新") -> str:
+        """将更新事件格式化为markdown：列表信息变化和详情差异"""
+        job = update['job']
+        lines = [heading, ""]
+        for field, (old, new) in update['changes'].items():
+            lines.append(f"- **{LIST_FIELD_LABELS[field]}**: {old or '无'} → {new or '无'}")
+        if update['diff']:
+            diff = update['diff']
+            if len(diff) > UPDATE_DIFF_MAX_LINES:
+                diff = diff[:UPDATE_DIFF_MAX_LINES] + [f"... 还有 {len(update['diff']) - UPDATE_DIFF_MAX_LINES} 行"]
+            lines.extend(["", "### 📝 详情变化", "```diff", *diff, "```"])
+        if job.get('url'):
+            lines.extend(["", "---", f"🔗 [查看详情]({job['url']})"])
+        return "\n".join(lines)
+    
+    def _build_update_message(self, update: Dict) -> tuple:
+        """构造更新事件的 (message_id, title, short, desp) 消息"""
+        job = update['job']
+        return (
+            self._update_message_id(job),
+            f"【更新】{job.get('title', '未知职位')}",
+            job.get('location', '未知地区'),
+            self._format_update_markdown(update)
+        )
+    
+    def _deliver_messages(self, messages: List[tuple]) -> Dict:
+        """把消息发给所有接收者：启用发件箱时入队由后台线程发送，否则并发推送
+        
+        返回发送成功数、失败数（或入队数）和总耗时
+        """
+        start = time.monotonic()
+        if self.outbox:
+            queued = sum(self.outbox.enqueue(key, messages) for key in self.server_chan_keys)
+            self.logger.info(f"已加入通知发件箱: {queued} 条，由后台线程发送")
+            self._publish_outbox_depth()
+            self.start_outbox_sender()
+            return {'queued': queued, 'seconds': time.monotonic() - start}
+        
+        recipients = list(enumerate(self.server_chan_keys, 1))
+        workers = min(self.notify_workers, len(recipients))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notify') as executor:
+            results = list(executor.map(
+                lambda recipient: self._send_to_recipient(recipient[0], recipient[1], messages),
+                recipients
+            ))
+        
+        stats = {
+            'sent': sum(result['sent'] for result in results),
+            'failed': sum(result['failed'] for result in results),
+            'seconds': time.monotonic() - start
+        }
+        self.logger.info(
+            f"通知发送完成: 成功 {stats['sent']} 条，失败 {stats['failed']} 条，耗时 {stats['seconds']:.2f} 秒"
+        )
+        return stats
+    
+    def _send_outbox_entry(self, entry: Dict):
+        """发送发件箱中的一条消息，受该密钥的令牌桶限速"""
+        key = self._outbox_recipients.get(entry['recipient'])
+        if key is None:
+            raise ValueError(f"接收者 {entry['recipient']} 的密钥已不在SERVER_CHAN_KEY中")
+        self._notify_buckets[key].acquire()
+        self._push_server_chan(key, entry['title'], entry['short'], entry['desp'],
+                               kind='outbox', retries=entry['attempts'])
+        self.logger.info(f"发件箱通知发送成功: {entry['title']} - {entry['short']}")
+    
+    def drain_outbox(self) -> Dict:
+        """发送发件箱中所有到期的消息"""
+        result = self.outbox.drain_once(self._send_outbox_entry, workers=self.notify_workers, stop=self._outbox_stop)
+        if result['sent'] or result['failed']:
+            self.logger.info(f"发件箱发送: 成功 {result['sent']} 条，失败 {result['failed']} 条")
+        # 没有发送时积压时间也在增长，每轮都刷新
+        self._publish_outbox_depth()
+        return result
+    
+    def _publish_outbox_depth(self):
+        """把发件箱的待发送和失败数量、积压时间和投递延迟写入运行状态和监控指标"""
+        stats = self.outbox.stats()
+        RUN_STATE.set_queue('outbox_pending', stats['pending'])
+        RUN_STATE.set_queue('outbox_failed', stats['failed'])
+        RUN_STATE.set_outbox(stats)
+        metrics.OUTBOX_PENDING.set(stats['pending'])
+        metrics.OUTBOX_OLDEST_PENDING_AGE.set(stats['oldest_pending_age'])
+        if stats['last_delivery_latency'] is not None:
+            metrics.OUTBOX_LAST_DELIVERY_LATENCY.set(stats['last_delivery_latency'])
+    
+    def _outbox_sender_loop(self):
+        """后台发送线程：定期或被唤醒时发送到期消息"""
+        while not self._outbox_stop.is_set():
+            try:
+                self.drain_outbox()
+            except Exception as e:
+                self.logger.error(f"发件箱发送出错: {e}")
+            self._outbox_wakeup.wait(self.outbox_poll_interval)
+            self._outbox_wakeup.clear()
+    
+    def start_outbox_sender(self):
+        """启动（或唤醒）发件箱后台发送线程"""
+        if not self.outbox:
+            return
+        if self._outbox_thread is None or not self._outbox_thread.is_alive():
+            self._outbox_stop.clear()
+            self._outbox_thread = threading.Thread(target=self._outbox_sender_loop, name='outbox-sender', daemon=True)
+            self._outbox_thread.start()
+        else:
+            self._outbox_wakeup.set()
+    
+    def flush_outbox(self, timeout: float) -> bool:
+        """等待发件箱中的消息发送完毕，超时返回False
+        
+        退避等待的消息如果在超时前到期，会继续等待并重试；之后才到期的消息不会阻塞退出，下次启动时继续发送
+        （单次运行时发送线程随爬虫实例关闭，这些消息要等到下次运行；常驻实例的发送线程会一直重试）
+        """
+        if not self.outbox:
+            return True
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            next_attempt = self.outbox.next_attempt_at()
+            remaining = deadline - time.monotonic()
+            if next_attempt is None or remaining <= 0 or next_attempt - time.time() > remaining:
+                break
+            if next_attempt <= time.time():
+                self.start_outbox_sender()
+            time.sleep(0.5)
+        
+        pending = self.outbox.stats()['pending']
+        if pending:
+            self.logger.warning(f"发件箱仍有 {pending} 条消息未发送，将在下次运行时继续")
+        return pending == 0
     
     def _format_notification_content(self, jobs: List[Dict]) -> str:
         """格式化通知内容"""
@@ -466,46 +1542,172 @@ class BankJobCrawler:
         
         return "\n".join(content_lines)
     
-    def run(self):
-        """运行爬虫"""
+    @contextmanager
+    def _stage(self, name: str):
+        """进入一个运行阶段：更新运行状态，并在运行报告中记录该阶段的耗时"""
+        RUN_STATE.set_phase(name)
+        with self.report.span(name):
+            yield
+    
+    def _finish_report(self, status: str):
+        """结束本次运行的报告，保存到RUN_REPORT_FILE"""
+        report, self.report = self.report, None
+        self.last_report = report.finish(status)
+        if self.run_report_file:
+            try:
+                report.save(self.run_report_file)
+            except Exception as e:
+                self.logger.error(f"保存运行报告失败: {e}")
+    
+    def run(self) -> int:
+        """运行爬虫，返回发现的新职位数
+        
+        各阶段耗时和HTTP请求明细以JSON日志输出，完整报告保存在last_report和RUN_REPORT_FILE中
+        """
         self.logger.info("开始运行银行招聘爬虫")
+        run_start = time.perf_counter()
+        RUN_STATE.start_run()
+        self.report = RunReport(self.logger)
+        status = 'error'
+        
+        # 继续发送上次未完成的通知
+        if self.outbox:
+            self._publish_outbox_depth()
+            if self.outbox.stats()['pending']:
+                self.start_outbox_sender()
         
         try:
             # 1. 获取职位列表
-            jobs = self.extract_job_list()
+            with self._stage('listing'):
+                jobs = self.extract_job_list()
             if not jobs:
                 self.logger.warning("未获取到任何职位信息")
-                return
+                status = 'empty'
+                metrics.RUNS.inc(status='empty')
+                RUN_STATE.finish_run('empty', jobs=0, new_jobs=0, stages=self.report.stage_durations())
+                return 0
             
             # 2. 检查新职位
-            new_jobs = self.check_new_jobs(jobs)
+            with self._stage('checking'):
+                new_jobs = self.check_new_jobs(jobs)
             
             # 3. 获取新职位的详细信息
-            for job in new_jobs:
-                self.get_job_details(job)
-                self.jobs_history[job['id']] = job  # 更新历史记录
+            with self._stage('details'):
+                self.fetch_job_details(new_jobs)
             
-            # 4. 保存历史数据
-            self._save_history()
+            # 4. 重新验证列表信息变化或最近发布的已知职位
+            with self._stage('revalidating'):
+                updates = self.check_updated_jobs(jobs, new_jobs)
             
-            # 5. 保存新职位到备份文件
-            if new_jobs:
-                self._save_jobs_backup(new_jobs)
+            # 启用发件箱时先把通知写入发件箱再保存历史：入队失败则本次运行出错、不保存历史，下次运行重新发现这些职位；
+            # 保存历史之前中断时，下次运行重复入队的消息按去重键忽略
+            if self.outbox and (new_jobs or updates):
+                with self._stage('notifying'):
+                    self.send_notification(new_jobs)
+                    self.send_update_notification(updates)
+            
+            # 5. 保存历史数据
+            with self._stage('saving'):
+                self._save_history()
             
-            # 6. 发送通知
+            # 6. 保存新职位到备份文件
             if new_jobs:
-                self.send_notification(new_jobs)
+                with self._stage('backup'):
+                    self._save_jobs_backup(new_jobs)
+            
+            # 清理过期或超出大小上限的缓存页面，失败（例如回填脚本正在写入同一缓存目录）时下次运行再清理
+            if self.page_cache:
+                with self._stage('evicting'):
+                    self._evict_page_cache()
+            
+            # 7. 发送通知（未启用发件箱时直接推送）
+            if not self.outbox and (new_jobs or updates):
+                with self._stage('notifying'):
+                    self.send_notification(new_jobs)
+                    self.send_update_notification(updates)
+            
+            self.logger.info(
+                f"爬虫运行完成，处理了 {len(jobs)} 个职位，新增 {len(new_jobs)} 个，更新 {len(updates)} 个"
+            )
+            status = 'success'
+            RUN_STATE.finish_run(
+                'success', jobs=len(jobs), new_jobs=len(new_jobs), updated_jobs=len(updates),
+                stages=self.report.stage_durations()
+            )
+            
+            metrics.RUNS.inc(status='success')
+            metrics.NEW_JOBS.set(len(new_jobs))
+            metrics.NEW_JOBS_TOTAL.inc(len(new_jobs))
+            metrics.HISTORY_SIZE.set(len(self.jobs_history))
+            metrics.LAST_SUCCESS.set(time.time())
             
-            self.logger.info(f"爬虫运行完成，处理了 {len(jobs)} 个职位，新增 {len(new_jobs)} 个")
+            stats = self.get_connection_stats()
+            self.logger.info(
+                f"连接复用统计: 请求 {stats['requests']} 次，新建连接 {stats['new_connections']} 次，复用 {stats['reused']} 次"
+            )
+            return len(new_jobs)
             
         except Exception as e:
+            metrics.RUNS.inc(status='error')
+            RUN_STATE.finish_run('error', error=str(e), stages=self.report.stage_durations())
             self.logger.error(f"爬虫运行出错: {e}")
             raise
+        finally:
+            metrics.RUN_DURATION.observe(time.perf_counter() - run_start)
+            self._finish_report(status)
+    
+    def profile_run(self, output_dir: Optional[str] = None) -> int:
+        """在cProfile和tracemalloc下运行一次爬虫，把统计结果写入output_dir（默认为数据目录下的profile）
+        
+        生成 run-<时间>.prof（可用 python -m pstats 或 snakeviz 查看）和 run-<时间>.memory.txt（内存分配最多的代码行）
+        """
+        output_dir = output_dir or os.path.join(os.path.dirname(self.data_file) or '.', 'profile')
+        os.makedirs(output_dir, exist_ok=True)
+        prefix = os.path.join(output_dir, f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        
+        profiler = cProfile.Profile()
+        tracemalloc.start(25)
+        profiler.enable()
+        try:
+            return self.run()
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            profiler.dump_stats(f"{prefix}.prof")
+            with open(f"{prefix}.memory.txt", 'w', encoding='utf-8') as f:
+                f.write(f"当前内存: {current / 1024 / 1024:.1f} MB，峰值: {peak / 1024 / 1024:.1f} MB\n\n")
+                for stat in snapshot.statistics('lineno')[:50]:
+                    f.write(f"{stat}\n")
+            
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+            self.logger.info(f"性能分析结果已保存: {prefix}.prof, {prefix}.memory.txt\n{summary.getvalue()}")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='银行招聘信息爬虫')
+    parser.add_argument('--export-backup', nargs='?', const='', metavar='OUTPUT',
+                        help='导出新内容在顶部的备份文件（默认写入BACKUP_FILE）后退出')
+    parser.add_argument('--profile', nargs='?', const='', metavar='OUTPUT_DIR',
+                        help='在cProfile和tracemalloc下运行，统计结果写入OUTPUT_DIR（默认为数据目录下的profile）')
+    args = parser.parse_args()
+    
     crawler = BankJobCrawler()
-    crawler.run()
+    try:
+        if args.export_backup is not None:
+            crawler.export_backup(args.export_backup or None)
+        else:
+            if args.profile is not None:
+                crawler.profile_run(args.profile or None)
+            else:
+                crawler.run()
+            # 单次运行时等待发件箱发送完毕再退出，未发送完的消息下次运行时继续
+            crawler.flush_outbox(crawler.outbox_flush_timeout)
+    finally:
+        crawler.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
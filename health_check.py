@@ -3,91 +3,125 @@
 """
 健康检查服务
 
-为Docker容器提供简单的健康检查端点
+为Docker容器提供简单的健康检查端点。状态信息直接读取进程内的运行状态和监控指标，
+使用多线程服务器，探测请求不访问磁盘，也不会互相阻塞
 """
 
+import os
+import hmac
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from datetime import datetime
 import json
-import os
+
+import metrics
+from run_state import RUN_STATE
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """健康检查请求处理器"""
     
+    # 立即抓取接口的访问令牌（未设置时只接受本机请求）和两次运行之间的最小间隔（秒）
+    crawl_token = ''
+    crawl_min_interval = 300.0
+    
     def do_GET(self):
         """处理GET请求"""
         if self.path == '/health':
             self.send_health_response()
         elif self.path == '/status':
             self.send_status_response()
+        elif self.path == '/metrics':
+            self.send_metrics_response()
+        else:
+            self.send_response(404)
+            self.end_headers()
+    
+    def do_POST(self):
+        """处理POST请求：/crawl 请求定时任务立即抓取一次"""
+        if self.path == '/crawl':
+            self.handle_crawl_request()
         else:
             self.send_response(404)
             self.end_headers()
     
+    def is_crawl_authorized(self) -> bool:
+        """配置了CRAWL_TRIGGER_TOKEN时校验请求头中的令牌，否则只允许本机请求"""
+        if not self.crawl_token:
+            return self.client_address[0] in ('127.0.0.1', '::1')
+        token = self.headers.get('X-Crawl-Token', '')
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        return hmac.compare_digest(token.encode(), self.crawl_token.encode())
+    
+    def handle_crawl_request(self):
+        """校验权限并请求立即抓取；正在运行或距离上次运行太近时返回429"""
+        if not self.is_crawl_authorized():
+            self.send_json(403, {'status': 'forbidden', 'timestamp': datetime.now().isoformat()})
+            return
+        
+        accepted, reason, retry_after = RUN_STATE.request_run(self.crawl_min_interval)
+        if not accepted:
+            self.send_json(429, {
+                'status': 'rejected',
+                'reason': reason,
+                'retry_after': round(retry_after),
+                'timestamp': datetime.now().isoformat()
+            }, headers={'Retry-After': str(max(1, round(retry_after)))})
+            return
+        
+        self.send_json(202, {
+            'status': 'accepted',
+            'phase': RUN_STATE.snapshot()['phase'],
+            'timestamp': datetime.now().isoformat()
+        })
+    
     def send_health_response(self):
         """发送健康检查响应"""
-        try:
-            # 检查关键文件是否存在
-            crawler_exists = os.path.exists('/app/crawler.py')
-            scheduler_exists = os.path.exists('/app/scheduler.py')
-            
-            if crawler_exists and scheduler_exists:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                response = {
-                    'status': 'healthy',
-                    'timestamp': datetime.now().isoformat(),
-                    'service': 'bank-crawler'
-                }
-                self.wfile.write(json.dumps(response).encode())
-            else:
-                self.send_response(500)
-                self.end_headers()
-        except Exception as e:
-            self.send_response(500)
-            self.end_headers()
+        self.send_json(200, {
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'service': 'bank-crawler'
+        })
     
     def send_status_response(self):
-        """发送状态信息响应"""
+        """发送状态信息响应：当前阶段、详情进度、队列深度和最近一次运行结果"""
         try:
-            # 获取数据文件信息
-            data_file = '/app/data/jobs_history.json'
-            log_file = '/app/logs/crawler.log'
-            
             status_info = {
                 'service': 'bank-crawler',
                 'timestamp': datetime.now().isoformat(),
-                'uptime': time.time(),
-                'files': {
-                    'data_exists': os.path.exists(data_file),
-                    'log_exists': os.path.exists(log_file)
-                }
+                'uptime': time.time() - metrics.PROCESS_START_TIME.value()
             }
-            
-            if os.path.exists(data_file):
-                status_info['files']['data_size'] = os.path.getsize(data_file)
-                status_info['files']['data_modified'] = datetime.fromtimestamp(
-                    os.path.getmtime(data_file)
-                ).isoformat()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(status_info, indent=2).encode())
+            status_info.update(RUN_STATE.snapshot())
+            self.send_json(200, status_info)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            error_response = {
+            self.send_json(500, {
                 'status': 'error',
                 'error': str(e),
                 'timestamp': datetime.now().isoformat()
-            }
-            self.wfile.write(json.dumps(error_response).encode())
+            })
+    
+    def send_json(self, status: int, data: dict, headers: dict = None):
+        """发送JSON响应"""
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_metrics_response(self):
+        """发送Prometheus格式的监控指标"""
+        body = metrics.REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """禁用默认日志输出"""
@@ -95,10 +129,17 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
 
 def start_health_server():
     """启动健康检查服务器"""
-    server = HTTPServer(('0.0.0.0', 8080), HealthCheckHandler)
+    HealthCheckHandler.crawl_token = os.getenv('CRAWL_TRIGGER_TOKEN', '')
+    HealthCheckHandler.crawl_min_interval = float(os.getenv('CRAWL_TRIGGER_MIN_INTERVAL', '300'))
+    server = ThreadingHTTPServer(('0.0.0.0', 8080), HealthCheckHandler)
     print(f"健康检查服务启动在端口 8080")
     print(f"健康检查端点: http://localhost:8080/health")
     print(f"状态信息端点: http://localhost:8080/status")
+    print(f"监控指标端点: http://localhost:8080/metrics")
+    if HealthCheckHandler.crawl_token:
+        print(f"立即抓取: curl -X POST -H 'Authorization: Bearer <CRAWL_TRIGGER_TOKEN>' http://localhost:8080/crawl")
+    else:
+        print(f"立即抓取: curl -X POST http://localhost:8080/crawl (未设置CRAWL_TRIGGER_TOKEN，只接受本机请求)")
     server.serve_forever()
 
 if __name__ == '__main__':
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+职位历史记录存储
+
+提供两种可替换的存储后端，均以 {job_id: job} 的字典接口供爬虫使用：
+1. JsonHistoryStore: 整个历史保存在一个JSON文件中（默认，兼容GitHub Actions回写仓库），
+   另存一份紧凑的ID索引，检测新职位时只需ID索引，完整记录按需加载
+2. SQLiteHistoryStore: 基于SQLite按ID索引，按需查询，只写入新增/修改的职位，可选用布隆过滤器前置判断
+"""
+
+import os
+import json
+import math
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ID索引中为每个职位保存的摘要字段：列表信息指纹、详情指纹、首次发现时间
+SUMMARY_FIELDS = ('list_hash', 'details_hash', 'crawl_time')
+
+
+def job_summary(job: Dict) -> tuple:
+    """提取职位的摘要字段，缺失的字段为空字符串"""
+    return tuple(job.get(field) or '' for field in SUMMARY_FIELDS)
+
+
+class BloomFilter:
+    """布隆过滤器：判断ID一定不存在或可能存在，内存只与容量有关"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class JsonHistoryStore(MutableMapping):
+    """JSON文件历史记录：ID索引常驻内存，完整记录按需加载
+
+    启动时只读取紧凑的ID索引文件（每行一个ID及其指纹摘要，按ID排序，首行记录对应JSON文件的大小和修改时间），
+    索引与JSON文件不一致时从JSON重建。新增职位直接追加到JSON文件末尾，
+    只有修改或删除已有职位时才加载全部记录并整体重写，文件内容与整体写入完全一致
+    """
+
+    def __init__(self, path: str, index_file: Optional[str] = None):
+        self.path = path
+        self.index_file = index_file
+        self.load()
+
+    def load(self):
+        """加载ID索引，完整记录在首次需要时再加载"""
+        self._records: Optional[Dict[str, Dict]] = None
+        self._new: Dict[str, Dict] = {}
+        self._rewrite = False
+        self._ids = self._read_index()
+        if self._ids is None:
+            self._ids = {job_id: job_summary(job) for job_id, job in self._load_records().items()}
+            self._write_index()
+            self._records = None  # 只保留ID索引，释放详情文本
+
+    def _data_signature(self) -> Optional[str]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return f"{stat.st_size} {stat.st_mtime_ns}"
+
+    def _read_index(self) -> Optional[Dict[str, tuple]]:
+        """读取ID索引，索引不存在或与JSON文件不一致时返回None"""
+        signature = self._data_signature()
+        if signature is None:
+            return {}
+        if not self.index_file or not os.path.exists(self.index_file):
+            return None
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                if f.readline().rstrip('\n') != f"# {signature}":
+                    return None
+                index = {}
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if parts[0]:
+                        index[parts[0]] = tuple(parts[1:] + [''] * (len(SUMMARY_FIELDS) + 1 - len(parts)))
+                return index
+        except Exception as e:
+            logger.warning(f"读取ID索引失败，将从历史数据重建: {e}")
+            return None
+
+    def _write_index(self):
+        """写入排序后的ID索引快照"""
+        signature = self._data_signature()
+        if not self.index_file or signature is None:
+            return
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(f"# {signature}\n")
+            for job_id in sorted(self._ids):
+                f.write('\t'.join((job_id,) + self._ids[job_id]) + '\n')
+        os.replace(tmp_file, self.index_file)
+
+    def _load_records(self) -> Dict[str, Dict]:
+        """加载全部历史记录（包括尚未保存的新职位）"""
+        if self._records is None:
+            records = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        records = json.load(f)
+                except Exception as e:
+                    logger.error(f"加载历史数据失败: {e}")
+            records.update(self._new)
+            self._records = records
+        return self._records
+
+    def __contains__(self, job_id) -> bool:
+        return job_id in self._ids
+
+    def __getitem__(self, job_id: str) -> Dict:
+        if job_id in self._new:
+            return self._new[job_id]
+        if job_id not in self._ids:
+            raise KeyError(job_id)
+        return self._load_records()[job_id]
+
+    def __setitem__(self, job_id: str, job: Dict):
+        if job_id in self._ids and job_id not in self._new:
+            # 修改已保存的职位，需要整体重写
+            self._load_records()[job_id] = job
+            self._ids[job_id] = job_summary(job)
+            self._rewrite = True
+            return
+        self._ids[job_id] = job_summary(job)
+        self._new[job_id] = job
+        if self._records is not None:
+            self._records[job_id] = job
+
+    def __delitem__(self, job_id: str):
+        if job_id not in self._ids:
+            raise KeyError(job_id)
+        self._load_records().pop(job_id, None)
+        self._new.pop(job_id, None)
+        del self._ids[job_id]
+        self._rewrite = True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._load_records()))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def clear(self):
+        self._records = {}
+        self._new = {}
+        self._ids = {}
+        self._rewrite = True
+
+    def fingerprint(self, job_id: str) -> Optional[Dict]:
+        """返回职位的指纹摘要（list_hash、details_hash、crawl_time），只读取ID索引"""
+        summary = self._ids.get(job_id)
+        if summary is None:
+            return None
+        return dict(zip(SUMMARY_FIELDS, summary))
+
+    def _append_new(self) -> bool:
+        """把新职位追加到JSON文件末尾，文件不存在或为空对象时返回False"""
+        if not os.path.exists(self.path):
+            return False
+        entries = json.dumps(self._new, ensure_ascii=False, indent=2)[1:-2]  # 去掉外层的 "{" 和 "\n}"
+        with open(self.path, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 64))
+            tail = f.read()
+            end = tail.rfind(b'}')
+            if end < 0 or tail[:end].rstrip().endswith(b'{'):
+                return False
+            f.seek(size - len(tail) + len(tail[:end].rstrip()))
+            f.write(f",{entries}\n}}".encode('utf-8'))
+            f.truncate()
+        return True
+
+    def save(self):
+        """保存历史数据：只有新增职位时追加写入，否则整体重写JSON文件"""
+        if not self._rewrite and not self._new:
+            return
+        if self._rewrite or not self._append_new():
+            records = self._load_records()
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        # 职位在加入后可能又被修改过（例如补充了详情），按保存的内容刷新摘要
+        changed = self._records if self._rewrite else self._new
+        for job_id, job in changed.items():
+            self._ids[job_id] = job_summary(job)
+        self._new = {}
+        self._rewrite = False
+        self._write_index()
+
+    def close(self):
+        """JSON存储无需释放资源"""
+        pass
+
+
+class SQLiteHistoryStore(MutableMapping):
+    """SQLite历史记录：按ID查询，写入的职位先暂存在内存中，save()时批量upsert
+
+    bloom=True 时启动时扫描ID建立布隆过滤器，判断为不存在的ID（新职位）无需查询数据库
+    """
+
+    def __init__(self, path: str, json_file: Optional[str] = None, bloom: bool = False):
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Dict] = {}
+        self._bloom: Optional[BloomFilter] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                crawl_time TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_crawl_time ON jobs (crawl_time);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+
+        if json_file:
+            self.migrate_from_json(json_file)
+        if bloom:
+            self._build_bloom()
+
+    def _build_bloom(self):
+        """按当前职位数的两倍容量重建布隆过滤器，只读取ID列"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] + len(self._pending)
+            bloom = BloomFilter(max(1024, count * 2))
+            for (job_id,) in self._conn.execute("SELECT id FROM jobs"):
+                bloom.add(job_id)
+            for job_id in self._pending:
+                bloom.add(job_id)
+            self._bloom = bloom
+
+    def migrate_from_json(self, json_file: str) -> int:
+        """从旧的JSON历史文件一次性导入数据，已导入过则跳过，返回导入的职位数"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+            if row or not os.path.exists(json_file):
+                return 0
+
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            except Exception as e:
+                logger.error(f"读取JSON历史数据失败，跳过迁移: {e}")
+                return 0
+
+            with self._conn:
+                self._upsert(history.values())
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                    (json_file,)
+                )
+            logger.info(f"已从 {json_file} 迁移 {len(history)} 条历史记录到 {self.path}")
+            return len(history)
+
+    def _upsert(self, jobs):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO jobs (id, crawl_time, data) VALUES (?, ?, ?)",
+            ((job['id'], job.get('crawl_time'), json.dumps(job, ensure_ascii=False)) for job in jobs)
+        )
+
+    def __contains__(self, job_id) -> bool:
+        with self._lock:
+            if self._bloom is not None and job_id not in self._bloom:
+                return False
+            if job_id in self._pending:
+                return True
+            return self._conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is not None
+
+    def fingerprint(self, job_id: str) -> Optional[Dict]:
+        """返回职位的指纹摘要（list_hash、details_hash、crawl_time）"""
+        try:
+            job = self[job_id]
+        except KeyError:
+            return None
+        return dict(zip(SUMMARY_FIELDS, job_summary(job)))
+
+    def __getitem__(self, job_id: str) -> Dict:
+        with self._lock:
+            if job_id in self._pending:
+                return self._pending[job_id]
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return json.loads(row[0])
+
+    def __setitem__(self, job_id: str, job: Dict):
+        with self._lock:
+            self._pending[job_id] = job
+            if self._bloom is not None:
+                self._bloom.add(job_id)
+                if self._bloom.count > self._bloom.capacity:
+                    self._build_bloom()
+
+    def __delitem__(self, job_id: str):
+        with self._lock:
+            found = self._pending.pop(job_id, None) is not None
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            if not found and cursor.rowcount == 0:
+                raise KeyError(job_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids())
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            for job_id in self._pending:
+                if self._conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                    count += 1
+        return count
+
+    def ids(self) -> List[str]:
+        """返回所有职位ID（包括尚未保存的）"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM jobs")]
+            known = set(ids)
+            ids.extend(job_id for job_id in self._pending if job_id not in known)
+        return ids
+
+    def save(self):
+        """批量写入新增/修改的职位"""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._conn:
+                self._upsert(self._pending.values())
+            self._pending.clear()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_history_store(backend: str, data_file: str, db_file: str,
+                         index_file: Optional[str] = None, bloom: bool = False):
+    """按配置创建历史记录存储，backend为json或sqlite
+
+    index_file为JSON存储的ID索引文件，bloom为SQLite存储是否启用布隆过滤器
+    """
+    backend = (backend or 'json').lower()
+    if backend == 'sqlite':
+        return SQLiteHistoryStore(db_file, json_file=data_file, bloom=bloom)
+    if backend != 'json':
+        logger.warning(f"未知的历史记录存储类型: {backend}，使用json")
+    return JsonHistoryStore(data_file, index_file=index_file)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置
+
+根日志记录器只挂一个QueueHandler，日志记录放入内存队列后立即返回，
+由后台线程（QueueListener）写入按大小或时间轮转的日志文件和控制台，
+并发抓取时记录日志不再争用文件处理器的锁，也不在请求线程中等待磁盘写入。
+
+setup_logging() 可以重复调用（例如定时任务每次运行都新建爬虫实例），
+同一进程中只会创建一组处理器；日志文件或轮转配置变化时替换为新的处理器。
+"""
+
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_handler: Optional[logging.handlers.QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_config: Optional[tuple] = None
+_pid: Optional[int] = None
+
+
+def _create_file_handler(log_file: str, rotate: str, max_bytes: int, backup_count: int) -> logging.Handler:
+    """rotate为size时按大小轮转，否则作为TimedRotatingFileHandler的when参数（例如midnight、H、D）"""
+    if rotate == 'size':
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    return logging.handlers.TimedRotatingFileHandler(
+        log_file, when=rotate, backupCount=backup_count, encoding='utf-8'
+    )
+
+
+def stop_logging():
+    """停止后台写入线程（写完队列中剩余的日志），并移除队列处理器"""
+    global _handler, _listener, _config, _pid
+    with _lock:
+        if _listener is not None and _pid == os.getpid():
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        if _handler is not None:
+            logging.getLogger().removeHandler(_handler)
+        _handler = _listener = _config = _pid = None
+
+
+def setup_logging(log_file: str, level: str = 'INFO', rotate: str = 'size',
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """配置队列日志：重复调用时复用已有处理器，配置变化时重建
+
+    根日志记录器已有其他处理器（由调用方自行配置）时不做修改
+    """
+    global _handler, _listener, _config, _pid
+    root = logging.getLogger()
+    config = (os.path.abspath(log_file), rotate, max_bytes, backup_count)
+
+    with _lock:
+        installed = _handler is not None and _handler in root.handlers
+        if not installed and root.handlers:
+            return
+        # 子进程（例如进程池中fork出的工作进程）继承了处理器，但没有继承后台写入线程，需要重建
+        if installed and _config == config and _pid == os.getpid():
+            root.setLevel(level)
+            return
+
+    stop_logging()
+
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [_create_file_handler(log_file, rotate, max_bytes, backup_count), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    with _lock:
+        _handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _config = config
+        _pid = os.getpid()
+        root.addHandler(_handler)
+        root.setLevel(level)
+        _listener.start()
+
+
+def setup_logging_from_env():
+    """按环境变量配置日志：LOG_FILE、LOG_LEVEL，以及LOG_ROTATE（size或midnight、H等）、LOG_MAX_BYTES、LOG_BACKUP_COUNT"""
+    setup_logging(
+        os.getenv('LOG_FILE', 'logs/crawler.log'),
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        rotate=os.getenv('LOG_ROTATE', 'size'),
+        max_bytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    )
+
+
+# 进程退出前写完队列中的日志
+atexit.register(stop_logging)
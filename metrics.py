@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内监控指标
+
+提供计数器、仪表和直方图，并按Prometheus文本格式输出，供健康检查服务的 /metrics 端点使用。
+爬虫和定时任务运行在同一进程中时，指标会直接反映最近的运行情况。
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 默认的耗时直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Dict] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值保存数据"""
+
+    kind = ''
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可任意设置的仪表"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    """直方图：统计各分桶的累计次数、总和与总数"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._values[key] = data
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data['counts'][i] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    def _render_sample(self, key, value) -> List[str]:
+        lines = []
+        for bound, count in zip(self.buckets, value['counts']):
+            labels = _format_labels(self.label_names, key, {'le': _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.label_names, key, {'le': '+Inf'})
+        lines.append(f"{self.name}_bucket{labels} {value['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(value['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {value['count']}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """按Prometheus文本格式输出所有指标"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PROCESS_START_TIME = REGISTRY.register(Gauge('crawler_process_start_time_seconds', '进程启动时间'))
+PROCESS_START_TIME.set(time.time())
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'crawler_http_request_duration_seconds', 'HTTP请求耗时', ('kind',)))
+HTTP_RESPONSE_BYTES = REGISTRY.register(Counter(
+    'crawler_http_response_bytes_total', '下载的响应体字节数', ('kind',)))
+HTTP_RETRIES = REGISTRY.register(Counter(
+    'crawler_http_retries_total', 'HTTP请求重试次数', ('kind',)))
+HTTP_FAILURES = REGISTRY.register(Counter(
+    'crawler_http_failures_total', '重试后仍失败的HTTP请求数', ('kind',)))
+PARSE_DURATION = REGISTRY.register(Histogram(
+    'crawler_parse_duration_seconds', '页面解析耗时', ('kind',)))
+PAGE_CACHE = REGISTRY.register(Counter(
+    'crawler_page_cache_requests_total', '详情页缓存查询次数', ('result',)))
+SOURCE_DURATION = REGISTRY.register(Histogram(
+    'crawler_source_duration_seconds', '单个列表来源（含翻页）的抓取耗时', ('source',)))
+SOURCE_FAILURES = REGISTRY.register(Counter(
+    'crawler_source_failures_total', '列表来源抓取失败次数', ('source',)))
+
+RUNS = REGISTRY.register(Counter('crawler_runs_total', '爬虫运行次数', ('status',)))
+RUN_DURATION = REGISTRY.register(Histogram(
+    'crawler_run_duration_seconds', '爬虫单次运行耗时', buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)))
+LAST_SUCCESS = REGISTRY.register(Gauge('crawler_last_success_timestamp_seconds', '最近一次成功运行的完成时间'))
+NEW_JOBS = REGISTRY.register(Gauge('crawler_new_jobs', '最近一次运行发现的新职位数'))
+NEW_JOBS_TOTAL = REGISTRY.register(Counter('crawler_new_jobs_total', '累计发现的新职位数'))
+UPDATED_JOBS_TOTAL = REGISTRY.register(Counter('crawler_updated_jobs_total', '累计发现的职位信息更新数'))
+HISTORY_SIZE = REGISTRY.register(Gauge('crawler_history_size', '历史记录中的职位数'))
+
+NOTIFICATION_DURATION = REGISTRY.register(Histogram(
+    'crawler_notification_duration_seconds', '单条通知推送耗时'))
+NOTIFICATIONS_SENT = REGISTRY.register(Counter('crawler_notifications_sent_total', '推送成功的通知数'))
+NOTIFICATION_FAILURES = REGISTRY.register(Counter('crawler_notification_failures_total', '推送失败的通知数'))
+OUTBOX_PENDING = REGISTRY.register(Gauge('crawler_outbox_pending', '发件箱中待发送的消息数'))
+OUTBOX_OLDEST_PENDING_AGE = REGISTRY.register(Gauge(
+    'crawler_outbox_oldest_pending_age_seconds', '发件箱中最早待发送消息的等待时间'))
+OUTBOX_LAST_DELIVERY_LATENCY = REGISTRY.register(Gauge(
+    'crawler_outbox_last_delivery_latency_seconds', '最近一条发件箱消息从入队到发送成功的耗时'))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟招聘网站
+
+用 page_examples 中的示例页面模拟银行招聘网站和Server酱接口，用于离线压测爬虫：
+1. /tag/shehuizhaopin_13698_N.html  分页的职位列表（按示例页面结构合成，支持ETag/304）
+2. /<bank>/<date>/<id>.htm          职位详情页（返回示例详情页）
+3. POST /<key>.send                  模拟Server酱推送接口
+4. /_stats                           请求计数
+
+可配置延迟、错误率、429限流和慢速响应。用法示例:
+    python mock_site.py --port 8000 --jobs 5000 --latency 0.05 --error-rate 0.02
+    BASE_URL=http://127.0.0.1:8000 \\
+    LIST_URL=http://127.0.0.1:8000/tag/shehuizhaopin_13698_1.html \\
+    SERVER_CHAN_API=http://127.0.0.1:8000 SERVER_CHAN_KEY=test python crawler.py
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'page_examples')
+
+# 示例列表页中每个职位的 <dl> 块
+JOB_ITEM_PATTERN = re.compile(
+    r'<dl>\s*<dt><a href="https?://[^/"]+/(?P<bank>[^/"]+)/[^"]+\.htm" title="(?P<title>[^"]*)">.*?</dt>'
+    r'.*?<dd class="lb"><a [^>]*title="(?P<company>[^"]*)">.*?</dd>\s*<dd>\s*(?P<city>.*?)\s*</dd>.*?</dl>',
+    re.DOTALL
+)
+LIST_PATH_PATTERN = re.compile(r'^/tag/shehuizhaopin_13698_(\d+)\.html$')
+DETAIL_PATH_PATTERN = re.compile(r'^/[^/]+/[^/]+/(\d+)\.htm$')
+
+ITEM_TEMPLATE = """<dl>
+				<dt><a href="{base}/{bank}/{date}/{job_id}.htm" title="{title}">{title}</a></dt>
+				<dd class="lb"><a href="{base}/{bank}/" title="{company}">{company}</a></dd>
+				<dd>
+					{city}
+					 </dd>
+				<dd class="list">{date} 09:00:00</dd>
+			</dl>"""
+
+
+class MockSite:
+    """模拟网站的数据与故障注入配置"""
+
+    def __init__(self, args):
+        self.base = args.public_url or f"http://{args.host}:{args.port}"
+        self.total_jobs = args.jobs
+        self.per_page = args.per_page
+        self.latency = args.latency
+        self.jitter = args.jitter
+        self.error_rate = args.error_rate
+        self.throttle_rate = args.throttle_rate
+        self.slow_body = args.slow_body
+        self.grow_interval = args.grow_interval
+        self.started = time.time()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+        with open(os.path.join(EXAMPLES_DIR, 'job_lists.html'), 'rb') as f:
+            list_html = f.read().decode('gbk')
+        with open(os.path.join(EXAMPLES_DIR, 'job_detail.html'), 'rb') as f:
+            self.detail_page = f.read()
+
+        # 用示例页面中的职位作为合成职位的模板，并把职位区域替换为占位符
+        matches = list(JOB_ITEM_PATTERN.finditer(list_html))
+        self.samples = [match.groupdict() for match in matches]
+        self.list_head = list_html[:matches[0].start()]
+        self.list_tail = list_html[matches[-1].end():]
+
+    def current_total(self) -> int:
+        """当前职位总数，设置了grow_interval时随时间增加，模拟新发布的职位"""
+        if self.grow_interval > 0:
+            return self.total_jobs + int((time.time() - self.started) / self.grow_interval)
+        return self.total_jobs
+
+    def list_page(self, page: int) -> bytes:
+        """生成第page页的列表，职位按ID从新到旧排列"""
+        total = self.current_total()
+        newest = 100000 + total
+        items = []
+        for offset in range((page - 1) * self.per_page, min(page * self.per_page, total)):
+            job_id = newest - offset
+            sample = self.samples[job_id % len(self.samples)]
+            items.append(ITEM_TEMPLATE.format(
+                base=self.base,
+                bank=sample['bank'],
+                date='2025-06-27',
+                job_id=job_id,
+                title=f"{sample['title']} #{job_id}",
+                company=sample['company'],
+                city=sample['city']
+            ))
+        return (self.list_head + ''.join(items) + self.list_tail).encode('gbk', errors='replace')
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    """模拟网站请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    site: MockSite = None
+
+    def _count(self, key: str):
+        with self.site.lock:
+            self.site.stats[key] += 1
+
+    def _inject_faults(self) -> bool:
+        """按配置注入延迟、429和500，已返回错误响应时返回True"""
+        delay = self.site.latency + random.uniform(0, self.site.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < self.site.throttle_rate:
+            self._count('throttled')
+            self._send(429, b'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+            return True
+        if random.random() < self.site.error_rate:
+            self._count('errors')
+            self._send(500, b'Internal Server Error', 'text/plain')
+            return True
+        return False
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=None):
+        """发送响应，配置了slow_body时分块慢速发送响应体"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if self.command == 'HEAD' or not body:
+            return
+        if self.site.slow_body > 0 and status == 200:
+            chunks = 10
+            size = len(body) // chunks + 1
+            for i in range(0, len(body), size):
+                self.wfile.write(body[i:i + size])
+                self.wfile.flush()
+                time.sleep(self.site.slow_body / chunks)
+        else:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        """处理GET请求"""
+        path = self.path.split('?', 1)[0]
+
+        if path == '/_stats':
+            body = json.dumps({'total_jobs': self.site.current_total(), **self.site.stats}).encode()
+            self._send(200, body, 'application/json')
+            return
+
+        list_match = LIST_PATH_PATTERN.match(path)
+        detail_match = DETAIL_PATH_PATTERN.match(path)
+        if not list_match and not detail_match:
+            self._count('not_found')
+            self._send(404, b'Not Found', 'text/plain')
+            return
+
+        if self._inject_faults():
+            return
+
+        if list_match:
+            self._count('list')
+            body = self.site.list_page(int(list_match.group(1)))
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._count('not_modified')
+                self._send(304, b'', 'text/html', {'ETag': etag})
+                return
+            self._send(200, body, 'text/html', {'ETag': etag})
+        else:
+            self._count('detail')
+            self._send(200, self.site.detail_page, 'text/html')
+
+    def do_POST(self):
+        """模拟Server酱推送接口"""
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        if not self.path.endswith('.send'):
+            self._send(404, b'Not Found', 'text/plain')
+            return
+        if self._inject_faults():
+            return
+
+        self._count('push')
+        body = json.dumps({'code': 0, 'message': '', 'data': {'pushid': str(self.site.stats['push'])}}).encode()
+        self._send(200, body, 'application/json')
+
+    def log_message(self, format, *args):
+        """禁用默认日志输出"""
+        pass
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='本地模拟招聘网站（压测用）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--public-url', help='页面中链接使用的地址，默认 http://host:port')
+    parser.add_argument('--jobs', type=int, default=2000, help='职位（详情页）总数')
+    parser.add_argument('--per-page', type=int, default=50, help='每个列表页的职位数')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回429的概率')
+    parser.add_argument('--slow-body', type=float, default=0.0, help='慢速发送响应体的总时长（秒）')
+    parser.add_argument('--grow-interval', type=float, default=0.0, help='每隔多少秒新增一个职位，0为不新增')
+    args = parser.parse_args()
+
+    MockSiteHandler.site = MockSite(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockSiteHandler)
+    print(f"模拟招聘网站启动在 http://{args.host}:{args.port}")
+    print(f"列表页: {MockSiteHandler.site.base}/tag/shehuizhaopin_13698_1.html")
+    print(f"请求统计: {MockSiteHandler.site.base}/_stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n模拟网站已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知发件箱
+
+把待推送的通知按 (消息, 接收者) 持久化到SQLite中，由后台线程发送：
+1. 入队时按去重键忽略重复消息
+2. 发送成功后才标记为已发送（至少一次投递），进程重启后继续发送未完成的消息
+3. 发送失败按指数退避重试，超过最大次数后标记为失败
+4. 不保存Server酱密钥本身，只保存密钥的哈希（recipient_id），发送时由调用方换回密钥
+"""
+
+import re
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RECIPIENT_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+
+def recipient_id(key: str) -> str:
+    """发件箱中代替Server酱密钥保存的接收者标识"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+class NotificationOutbox:
+    """基于SQLite的持久化通知发件箱"""
+
+    def __init__(self, path: str, max_attempts: int = 8, backoff_base: float = 30.0,
+                 backoff_max: float = 3600.0, retention_days: float = 7.0):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT NOT NULL UNIQUE,
+                recipient TEXT NOT NULL,
+                title TEXT NOT NULL,
+                short TEXT,
+                desp TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                created REAL NOT NULL,
+                sent_at REAL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+        """)
+        self._conn.commit()
+        self._hash_legacy_recipients()
+
+    def _hash_legacy_recipients(self):
+        """旧版本的发件箱直接保存密钥，改为保存哈希"""
+        recipients = [row[0] for row in self._conn.execute("SELECT DISTINCT recipient FROM outbox")]
+        legacy = [key for key in recipients if not RECIPIENT_ID_PATTERN.match(key)]
+        if not legacy:
+            return
+        with self._conn:
+            for key in legacy:
+                rid = recipient_id(key)
+                self._conn.execute(
+                    "UPDATE outbox SET recipient = ?, dedup_key = ? || substr(dedup_key, ?) WHERE recipient = ?",
+                    (rid, rid, len(key) + 1, key)
+                )
+        logger.info(f"发件箱中 {len(legacy)} 个接收者的密钥已替换为哈希")
+
+    def enqueue(self, key: str, messages: List[tuple]) -> int:
+        """为一个接收者（Server酱密钥）加入 (message_id, title, short, desp) 消息，返回实际新增的条数
+
+        只保存密钥的哈希，取出的消息中recipient为recipient_id(key)
+        """
+        now = time.time()
+        recipient = recipient_id(key)
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO outbox (dedup_key, recipient, title, short, desp, next_attempt, created)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                ((f"{recipient}:{message_id}", recipient, title, short, desp, now, now)
+                 for message_id, title, short, desp in messages)
+            )
+            return self._conn.total_changes - before
+
+    def due_entries(self, limit: int = 100) -> List[Dict]:
+        """取出到期待发送的消息，按入队顺序排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT id, recipient, title, short, desp, attempts, created FROM outbox
+                   WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?""",
+                (time.time(), limit)
+            ).fetchall()
+        fields = ('id', 'recipient', 'title', 'short', 'desp', 'attempts', 'created')
+        return [dict(zip(fields, row)) for row in rows]
+
+    def next_attempt_at(self) -> Optional[float]:
+        """待发送消息中最早的下次发送时间（时间戳），没有待发送消息时返回None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def mark_sent(self, entry: Dict):
+        """标记消息已发送"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                (time.time(), entry['id'])
+            )
+
+    def mark_failed(self, entry: Dict, error: str):
+        """记录发送失败，按指数退避安排重试，超过最大次数后不再重试"""
+        attempts = entry['attempts'] + 1
+        status = 'failed' if attempts >= self.max_attempts else 'pending'
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, error[:500], entry['id'])
+            )
+
+    def drain_once(self, send: Callable[[Dict], None], workers: int = 1,
+                   stop: Optional[threading.Event] = None) -> Dict:
+        """发送所有到期消息：不同接收者并发，同一接收者按入队顺序发送
+
+        send(entry)失败时应抛出异常；同一时间只允许一个drain_once执行；
+        stop被设置后不再发送剩余的消息，留到下次发送
+        """
+        result = {'sent': 0, 'failed': 0}
+        with self._drain_lock:
+            entries = self.due_entries(limit=1000)
+            if not entries:
+                return result
+
+            by_recipient: Dict[str, List[Dict]] = {}
+            for entry in entries:
+                by_recipient.setdefault(entry['recipient'], []).append(entry)
+
+            def send_all(recipient_entries: List[Dict]) -> Dict:
+                counts = {'sent': 0, 'failed': 0}
+                for entry in recipient_entries:
+                    if stop is not None and stop.is_set():
+                        break
+                    try:
+                        send(entry)
+                    except Exception as e:
+                        self.mark_failed(entry, str(e))
+                        counts['failed'] += 1
+                    else:
+                        self.mark_sent(entry)
+                        counts['sent'] += 1
+                return counts
+
+            if workers <= 1 or len(by_recipient) == 1:
+                results = [send_all(group) for group in by_recipient.values()]
+            else:
+                with ThreadPoolExecutor(max_workers=min(workers, len(by_recipient)),
+                                        thread_name_prefix='outbox') as executor:
+                    results = list(executor.map(send_all, by_recipient.values()))
+
+            for counts in results:
+                result['sent'] += counts['sent']
+                result['failed'] += counts['failed']
+
+            self._purge()
+        return result
+
+    def _purge(self):
+        """删除超过保留期的已发送消息"""
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (cutoff,))
+
+    def stats(self) -> Dict:
+        """队列深度与投递延迟统计"""
+        with self._lock:
+            return outbox_stats(self._conn)
+
+    def close(self):
+        """等待正在进行的drain_once结束后关闭数据库连接"""
+        with self._drain_lock, self._lock:
+            self._conn.close()
+
+
+def outbox_stats(conn: sqlite3.Connection) -> Dict:
+    """统计待发送/失败/已发送数量、最早待发送消息的等待时间和最近一次投递延迟"""
+    now = time.time()
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+    oldest_pending = conn.execute("SELECT MIN(created) FROM outbox WHERE status = 'pending'").fetchone()[0]
+    last_sent = conn.execute(
+        "SELECT sent_at, sent_at - created FROM outbox WHERE status = 'sent' ORDER BY sent_at DESC LIMIT 1"
+    ).fetchone()
+    return {
+        'pending': counts.get('pending', 0),
+        'failed': counts.get('failed', 0),
+        'sent': counts.get('sent', 0),
+        'oldest_pending_age': now - oldest_pending if oldest_pending else 0,
+        'last_sent_at': last_sent[0] if last_sent else None,
+        'last_delivery_latency': last_sent[1] if last_sent else None
+    }
+
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始页面缓存
+
+把详情页的原始HTML按内容哈希压缩保存到磁盘（相同内容只存一份），并按URL建立索引：
+1. 命中缓存时直接返回原始字节和编码，不发送网络请求
+2. 提取逻辑修改后可以从缓存的原始页面重新解析历史职位
+3. 超过保存期限或总大小上限时，按最近访问时间淘汰
+"""
+
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """基于内容寻址的压缩页面缓存"""
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024, max_age_days: float = 30.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                encoding TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_digest ON pages (digest);
+            CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.gz")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.max_age_days > 0 and time.time() - stored_at > self.max_age_days * 86400
+
+    def read_blob(self, digest: str) -> Optional[bytes]:
+        """按内容哈希读取原始页面，文件丢失或损坏时返回None"""
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return gzip.decompress(f.read())
+        except (OSError, EOFError) as e:
+            logger.warning(f"读取缓存页面失败: {digest}, {e}")
+            return None
+
+    def get(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """返回URL对应的 (原始字节, 编码)，未缓存或已过期时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, encoding, stored_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or self._expired(row[2]):
+            return None
+
+        content = self.read_blob(row[0])
+        if content is None:
+            return None
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return content, row[1]
+
+    def put(self, url: str, content: bytes, encoding: Optional[str] = None) -> str:
+        """保存页面原始字节，返回内容哈希；相同内容只写入一次"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(gzip.compress(content, mtime=0))
+            os.replace(tmp_file, path)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, os.path.getsize(path))
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, digest, encoding, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, encoding, now, now)
+            )
+        return digest
+
+    def iter_pages(self) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """按URL遍历所有未过期的缓存页面，返回 (url, digest, encoding)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url, digest, encoding, stored_at FROM pages ORDER BY url").fetchall()
+        for url, digest, encoding, stored_at in rows:
+            if not self._expired(stored_at):
+                yield url, digest, encoding
+
+    def evict(self) -> Dict:
+        """删除过期页面，总大小超过上限时按最近访问时间淘汰，并清理不再被引用的内容"""
+        removed_pages = 0
+        with self._lock, self._conn:
+            if self.max_age_days > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM pages WHERE stored_at < ?", (time.time() - self.max_age_days * 86400,)
+                )
+                removed_pages += cursor.rowcount
+
+            if self.max_bytes > 0:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+                if total > self.max_bytes:
+                    rows = self._conn.execute(
+                        """SELECT pages.url, blobs.digest, blobs.size FROM pages JOIN blobs ON pages.digest = blobs.digest
+                           ORDER BY pages.accessed_at"""
+                    ).fetchall()
+                    freed = set()
+                    for url, digest, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                        removed_pages += 1
+                        if digest not in freed and not self._conn.execute(
+                                "SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                            freed.add(digest)
+                            total -= size
+
+            orphans = [row[0] for row in self._conn.execute(
+                "SELECT digest FROM blobs WHERE digest NOT IN (SELECT digest FROM pages)"
+            )]
+            self._conn.executemany("DELETE FROM blobs WHERE digest = ?", ((digest,) for digest in orphans))
+
+        for digest in orphans:
+            path = self._blob_path(digest)
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))  # 目录中还有其他文件时会失败，忽略
+            except OSError:
+                pass
+        return {'pages': removed_pages, 'blobs': len(orphans)}
+
+    def stats(self) -> Dict:
+        """缓存的页面数、内容数和压缩后总大小"""
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {'pages': pages, 'blobs': blobs, 'bytes': size}
+
+    def close(self):
+        """关闭索引数据库"""
+        with self._lock:
+            self._conn.close()
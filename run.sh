@@ -104,6 +104,7 @@ show_help() {
     echo "  install     安装依赖"
     echo "  status      查看运行状态"
     echo "  logs        查看日志"
+    echo "  backup      导出备份文件（新内容在顶部）"
     echo "  setup       初始化环境"
     echo "  help        显示此帮助信息"
     echo ""
@@ -206,6 +207,14 @@ show_status() {
     fi
 }
 
+# 导出备份文件
+export_backup() {
+    log_info "导出备份文件..."
+    check_python
+    
+    $PYTHON_CMD crawler.py --export-backup
+}
+
 # 查看日志
 show_logs() {
     if [ -f "logs/crawler.log" ]; then
@@ -240,6 +249,9 @@ main() {
         "logs")
             show_logs
             ;;
+        "backup")
+            export_backup
+            ;;
         "help"|"--help"|"-h")
             show_help
             ;;
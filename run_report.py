@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行报告
+
+记录一次爬虫运行中各阶段的耗时（span）、每个HTTP请求的明细（方法、URL、状态码、字节数、耗时、重试次数）
+以及页面解析等累计耗时。每个阶段结束和每个请求完成时输出一行JSON日志，
+运行结束后可以保存为JSON文件，用于分析一次运行慢在抓取、解析、比较、保存还是通知。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class RunReport:
+    """一次运行的阶段耗时和HTTP请求明细（线程安全）"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status: Optional[str] = None
+        self.duration: Optional[float] = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: List[Dict] = []
+        self.requests: List[Dict] = []
+        self.timings: Dict[str, Dict] = {}
+
+    def _emit(self, event: str, entry: Dict):
+        self.logger.info(json.dumps(dict(entry, event=event), ensure_ascii=False))
+
+    @contextmanager
+    def span(self, stage: str):
+        """记录一个阶段的开始时间（相对运行开始）和耗时，阶段内抛出异常时记录错误"""
+        offset = time.perf_counter() - self._start
+        entry = {'stage': stage, 'offset': round(offset, 6), 'duration': None, 'error': None}
+        try:
+            yield entry
+        except Exception as e:
+            entry['error'] = str(e)
+            raise
+        finally:
+            entry['duration'] = round(time.perf_counter() - self._start - offset, 6)
+            with self._lock:
+                self.stages.append(entry)
+            self._emit('stage', entry)
+
+    def record_request(self, url: str, kind: str, status: Optional[int], size: int,
+                       latency: float, retries: int, error: Optional[str] = None, method: str = 'GET'):
+        """记录一个HTTP请求（含重试）的结果，latency为最后一次尝试的耗时"""
+        entry = {
+            'method': method, 'url': url, 'kind': kind, 'status': status, 'bytes': size,
+            'latency': round(latency, 6), 'retries': retries, 'error': error
+        }
+        with self._lock:
+            self.requests.append(entry)
+        self._emit('request', entry)
+
+    def add_timing(self, name: str, seconds: float):
+        """累计某类操作（例如 parse.detail）的次数和总耗时"""
+        with self._lock:
+            timing = self.timings.setdefault(name, {'count': 0, 'seconds': 0.0})
+            timing['count'] += 1
+            timing['seconds'] += seconds
+
+    def stage_durations(self) -> Dict[str, float]:
+        """各阶段的耗时（秒）"""
+        with self._lock:
+            return {entry['stage']: entry['duration'] for entry in self.stages}
+
+    def finish(self, status: str) -> Dict:
+        """结束运行，输出汇总日志并返回完整报告"""
+        self.status = status
+        self.finished_at = time.time()
+        self.duration = time.perf_counter() - self._start
+        report = self.to_dict()
+        self._emit('run', dict(report['summary'], status=status, stages=self.stage_durations()))
+        return report
+
+    def to_dict(self) -> Dict:
+        """完整报告：汇总、各阶段、累计耗时和请求明细"""
+        with self._lock:
+            stages = [dict(entry) for entry in self.stages]
+            requests = [dict(entry) for entry in self.requests]
+            timings = {name: {'count': t['count'], 'seconds': round(t['seconds'], 6)}
+                       for name, t in self.timings.items()}
+
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._start
+        latencies = sorted(entry['latency'] for entry in requests)
+        summary = {
+            'duration': round(duration, 6),
+            'requests': len(requests),
+            'failed_requests': sum(1 for entry in requests if entry['error'] is not None),
+            'retries': sum(entry['retries'] for entry in requests),
+            'bytes': sum(entry['bytes'] for entry in requests),
+            'request_seconds': round(sum(latencies), 6),
+            'max_latency': latencies[-1] if latencies else 0
+        }
+        return {
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'status': self.status,
+            'summary': summary,
+            'stages': stages,
+            'timings': timings,
+            'requests': requests
+        }
+
+    def save(self, path: str):
+        """把报告写入JSON文件"""
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, path)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行状态登记
+
+爬虫和定时任务把当前阶段、详情抓取进度、队列深度和最近一次运行结果写入进程内的共享状态，
+健康检查服务的 /status 直接返回内存中的快照，不访问磁盘；
+健康检查服务也可以通过 request_run() 请求定时任务立即执行一次抓取。
+"""
+
+import copy
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class RunState:
+    """线程安全的运行状态登记表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._run_requested = threading.Event()
+        self._state = {
+            'phase': 'idle',
+            'run_started_at': None,
+            'progress': {'done': 0, 'total': 0},
+            'queues': {},
+            'sources': {},
+            'outbox': None,
+            'runs': 0,
+            'last_run': None,
+            'last_success_at': None,
+            'next_run_at': None
+        }
+
+    def start_run(self):
+        """记录一次运行开始"""
+        with self._lock:
+            self._state['phase'] = 'starting'
+            self._state['run_started_at'] = time.time()
+            self._state['progress'] = {'done': 0, 'total': 0}
+
+    def set_phase(self, phase: str):
+        """记录当前运行阶段"""
+        with self._lock:
+            self._state['phase'] = phase
+
+    def set_progress(self, done: int, total: int):
+        """记录详情页抓取进度"""
+        with self._lock:
+            self._state['progress'] = {'done': done, 'total': total}
+
+    def set_queue(self, name: str, depth: int):
+        """记录某个队列的当前深度"""
+        with self._lock:
+            self._state['queues'][name] = depth
+
+    def set_sources(self, sources: Dict):
+        """记录各列表来源最近一次抓取的职位数、耗时和错误"""
+        with self._lock:
+            self._state['sources'] = copy.deepcopy(sources)
+
+    def set_outbox(self, stats: Dict):
+        """记录通知发件箱的积压情况：最早待发送消息的等待时间和最近一次投递延迟"""
+        with self._lock:
+            self._state['outbox'] = {
+                'oldest_pending_age': stats.get('oldest_pending_age'),
+                'last_sent_at': stats.get('last_sent_at'),
+                'last_delivery_latency': stats.get('last_delivery_latency')
+            }
+
+    def set_next_run(self, timestamp: Optional[float]):
+        """记录下一次计划运行的时间"""
+        with self._lock:
+            self._state['next_run_at'] = timestamp
+
+    def finish_run(self, status: str, error: Optional[str] = None, **summary):
+        """记录一次运行结束，status为success/empty/error，summary为职位数等附加信息"""
+        now = time.time()
+        with self._lock:
+            started = self._state['run_started_at'] or now
+            self._state['phase'] = 'idle'
+            self._state['run_started_at'] = None
+            self._state['runs'] += 1
+            self._state['last_run'] = dict(
+                summary, status=status, error=error,
+                started_at=started, finished_at=now, duration=now - started
+            )
+            if status == 'success':
+                self._state['last_success_at'] = now
+
+    def request_run(self, min_interval: float = 0) -> Tuple[bool, Optional[str], float]:
+        """请求立即执行一次抓取（由定时任务在wait_for_run_request中响应）
+
+        正在运行、已有未处理的请求，或距离上次运行结束不足min_interval秒时拒绝，
+        返回 (是否接受, 拒绝原因, 建议等待的秒数)
+        """
+        with self._lock:
+            if self._state['phase'] != 'idle':
+                return False, 'run_in_progress', max(1.0, min_interval)
+            if self._run_requested.is_set():
+                return False, 'already_requested', 1.0
+            last_run = self._state['last_run']
+            if last_run and min_interval > 0:
+                wait = last_run['finished_at'] + min_interval - time.time()
+                if wait > 0:
+                    return False, 'too_soon', wait
+            self._run_requested.set()
+        return True, None, 0.0
+
+    def wait_for_run_request(self, timeout: Optional[float]) -> bool:
+        """等待抓取请求，收到请求时返回True并清除请求，超时返回False"""
+        if self._run_requested.wait(timeout):
+            self._run_requested.clear()
+            return True
+        return False
+
+    def snapshot(self) -> Dict:
+        """返回当前状态的副本"""
+        with self._lock:
+            return copy.deepcopy(self._state)
+
+
+RUN_STATE = RunState()
@@ -5,61 +5,255 @@
 
 用于定期运行银行招聘爬虫
 可以通过crontab或直接运行此脚本来实现定时任务
+
+SCHEDULE_MODE=daily（默认）时每天在SCHEDULE_AT执行一次；
+SCHEDULE_MODE=adaptive 时按自适应间隔轮询：发现新职位后缩短到最小间隔，
+没有新职位时按倍数逐步拉长到最大间隔，并支持静默时段和随机抖动
+
+WARM_CRAWLER=true 时常驻一个爬虫实例，在多次运行之间复用历史记录、连接池和缓存，
+只在.env文件变化时重新加载配置；两种模式都可以通过 POST /crawl 立即触发一次抓取
 """
 
+import os
 import schedule
 import time
+import random
 import logging
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from dotenv import load_dotenv
 from crawler import BankJobCrawler
 from health_check import start_health_server
+from logging_setup import setup_logging_from_env
+from run_state import RUN_STATE
+
+logger = logging.getLogger(__name__)
 
-def run_crawler():
-    """运行爬虫任务"""
+def run_crawler(crawler: Optional[BankJobCrawler] = None) -> Optional[int]:
+    """运行爬虫任务，返回发现的新职位数，失败时返回None
+    
+    传入常驻的爬虫实例时直接复用，否则新建一个实例并在运行后关闭
+    """
     try:
         print(f"\n{'='*50}")
         print(f"开始执行定时任务: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*50}")
         
-        crawler = BankJobCrawler()
-        crawler.run()
+        if crawler is not None:
+            # 常驻实例的发件箱线程一直运行，无需等待发送完毕
+            new_count = crawler.run()
+        else:
+            crawler = BankJobCrawler()
+            try:
+                new_count = crawler.run()
+                crawler.flush_outbox(crawler.outbox_flush_timeout)
+            finally:
+                crawler.close()
         
         print(f"\n{'='*50}")
         print(f"定时任务执行完成: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*50}\n")
-        
+        return new_count
+    
     except Exception as e:
-        logging.error(f"定时任务执行失败: {e}")
+        logger.error(f"定时任务执行失败: {e}")
         print(f"任务执行失败: {e}")
+        return None
 
-def main():
-    """主函数 - 设置定时任务"""
-    print("银行招聘爬虫定时任务启动")
-    print("任务计划: 每天上午9点执行")
+class WarmCrawler:
+    """常驻爬虫实例：多次运行之间复用，.env文件变化时重新加载配置并重建实例"""
     
-    # 启动健康检查服务器（后台线程）
-    health_thread = threading.Thread(target=start_health_server, daemon=True)
-    health_thread.start()
+    def __init__(self, env_file: str = '.env'):
+        self.env_file = env_file
+        self.crawler: Optional[BankJobCrawler] = None
+        self._env_mtime = self._read_env_mtime()
+    
+    def _read_env_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.env_file)
+        except OSError:
+            return None
+    
+    def get(self) -> BankJobCrawler:
+        """返回常驻实例，首次调用或.env变化时创建新实例"""
+        mtime = self._read_env_mtime()
+        if self.crawler is not None and mtime != self._env_mtime:
+            print(f"检测到 {self.env_file} 已修改，重新加载配置")
+            load_dotenv(self.env_file, override=True)
+            self.close()
+        self._env_mtime = mtime
+        
+        if self.crawler is None:
+            self.crawler = BankJobCrawler()
+        return self.crawler
+    
+    def run(self) -> Optional[int]:
+        """使用常驻实例运行一次爬虫"""
+        try:
+            crawler = self.get()
+        except Exception as e:
+            logger.error(f"创建爬虫实例失败: {e}")
+            print(f"任务执行失败: {e}")
+            return None
+        return run_crawler(crawler)
+    
+    def close(self):
+        """关闭常驻实例，未发送的通知保留在发件箱中"""
+        if self.crawler is not None:
+            self.crawler.close()
+            self.crawler = None
+
+def parse_quiet_hours(value: str) -> Optional[Tuple[int, int]]:
+    """解析 "HH:MM-HH:MM" 格式的静默时段，返回一天中的起止分钟数，可跨越午夜
+    
+    格式错误或时间超出范围（小时0-23，分钟0-59）时忽略并返回None
+    """
+    if not value or not value.strip():
+        return None
+    try:
+        start, end = value.strip().split('-')
+        start_h, start_m = (int(part) for part in start.split(':'))
+        end_h, end_m = (int(part) for part in end.split(':'))
+        if not (0 <= start_h <= 23 and 0 <= end_h <= 23 and 0 <= start_m <= 59 and 0 <= end_m <= 59):
+            raise ValueError("时间超出范围")
+    except ValueError:
+        logger.warning(f"无法解析静默时段: {value}，忽略")
+        return None
+    return start_h * 60 + start_m, end_h * 60 + end_m
+
+class AdaptivePoller:
+    """自适应轮询间隔：有新职位时缩短，没有时逐步退避"""
     
-    # 设置定时任务 - 每天上午9点执行
-    schedule.every().day.at("09:00").do(run_crawler)
+    def __init__(self, min_interval: float, max_interval: float, backoff: float = 2.0,
+                 jitter: float = 0.1, quiet_hours: Optional[Tuple[int, int]] = None):
+        self.min_interval = max(1.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.jitter = min(max(0.0, jitter), 0.5)
+        self.quiet_hours = quiet_hours
+        self.interval = self.min_interval
+    
+    def update(self, new_jobs: Optional[int]):
+        """根据上次运行结果调整间隔，运行失败(None)时保持不变"""
+        if new_jobs is None:
+            return
+        if new_jobs > 0:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+    
+    def in_quiet_hours(self, moment: datetime) -> bool:
+        """判断某个时间点是否处于静默时段"""
+        if not self.quiet_hours:
+            return False
+        start, end = self.quiet_hours
+        minute = moment.hour * 60 + moment.minute
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+    
+    def quiet_hours_end(self, moment: datetime) -> datetime:
+        """静默时段中的某个时间点之后，静默结束的时间"""
+        end = self.quiet_hours[1]
+        result = moment.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+        if result <= moment:
+            result += timedelta(days=1)
+        return result
+    
+    def next_run(self, now: datetime) -> datetime:
+        """按当前间隔加随机抖动计算下次运行时间，落在静默时段时推迟到静默结束"""
+        delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        due = now + timedelta(seconds=delay)
+        if self.in_quiet_hours(due):
+            # 静默结束后也加一点抖动，避免每天在同一时刻请求
+            due = self.quiet_hours_end(due) + timedelta(seconds=random.uniform(0, self.jitter * self.min_interval))
+        return due
+
+def create_poller() -> AdaptivePoller:
+    """从环境变量创建自适应轮询配置"""
+    return AdaptivePoller(
+        min_interval=float(os.getenv('POLL_MIN_INTERVAL', '600')),
+        max_interval=float(os.getenv('POLL_MAX_INTERVAL', '14400')),
+        backoff=float(os.getenv('POLL_BACKOFF', '2')),
+        jitter=float(os.getenv('POLL_JITTER', '0.1')),
+        quiet_hours=parse_quiet_hours(os.getenv('POLL_QUIET_HOURS', ''))
+    )
+
+def sleep_until(timestamp: float) -> bool:
+    """休眠到指定时间，期间收到立即抓取请求时提前返回True"""
+    RUN_STATE.set_next_run(timestamp)
+    return RUN_STATE.wait_for_run_request(max(0.0, timestamp - time.time()))
+
+def run_daily(run_at: str, job: Callable[[], Optional[int]]):
+    """每天在固定时间执行"""
+    schedule.every().day.at(run_at).do(job)
     
     # 也可以设置其他时间，例如:
     # schedule.every().day.at("18:00").do(run_crawler)  # 每天下午6点
     # schedule.every().hour.do(run_crawler)  # 每小时执行
     # schedule.every(30).minutes.do(run_crawler)  # 每30分钟执行
     
+    while True:
+        schedule.run_pending()
+        # 直接休眠到下一个任务的执行时间
+        if sleep_until(schedule.next_run().timestamp()):
+            print("收到立即抓取请求")
+            job()
+
+def run_adaptive(poller: AdaptivePoller, job: Callable[[], Optional[int]]):
+    """按自适应间隔轮询，启动时立即执行一次（静默时段除外）"""
+    due = datetime.now()
+    if poller.in_quiet_hours(due):
+        due = poller.quiet_hours_end(due)
+    
+    while True:
+        if sleep_until(due.timestamp()):
+            print("收到立即抓取请求")
+        new_jobs = job()
+        poller.update(new_jobs)
+        due = poller.next_run(datetime.now())
+        print(f"下次执行时间: {due.strftime('%Y-%m-%d %H:%M:%S')} (间隔 {poller.interval / 60:.0f} 分钟)")
+
+def main():
+    """主函数 - 设置定时任务"""
+    # 先配置日志，避免解析配置时的警告让根日志记录器带上默认处理器
+    setup_logging_from_env()
+    
+    mode = os.getenv('SCHEDULE_MODE', 'daily').lower()
+    run_at = os.getenv('SCHEDULE_AT', '09:00')
+    warm = None
+    if os.getenv('WARM_CRAWLER', 'false').lower() == 'true':
+        warm = WarmCrawler(os.getenv('ENV_FILE', '.env'))
+    job = warm.run if warm else run_crawler
+    
+    print("银行招聘爬虫定时任务启动")
+    if mode == 'adaptive':
+        poller = create_poller()
+        print(f"任务计划: 自适应轮询，间隔 {poller.min_interval / 60:.0f}-{poller.max_interval / 60:.0f} 分钟")
+    else:
+        print(f"任务计划: 每天 {run_at} 执行")
+    if warm:
+        print("常驻爬虫实例: 已启用")
+    
+    # 启动健康检查服务器（后台线程）
+    health_thread = threading.Thread(target=start_health_server, daemon=True)
+    health_thread.start()
+    
     print("定时任务已设置，等待执行...")
     print("健康检查服务已启动在端口 8080")
     print("按 Ctrl+C 停止程序")
     
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+        if mode == 'adaptive':
+            run_adaptive(poller, job)
+        else:
+            run_daily(run_at, job)
     except KeyboardInterrupt:
         print("\n程序已停止")
+    finally:
+        if warm:
+            warm.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
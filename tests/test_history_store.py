@@ -0,0 +1,164 @@
+"""JsonHistoryStore 的追加写入与ID索引测试"""
+
+import json
+import os
+
+import pytest
+
+from history_store import JsonHistoryStore
+
+
+def make_job(job_id, **fields):
+    job = {
+        'id': job_id,
+        'title': f'[湖北]2025年湖北银行招聘 {job_id}',
+        'url': f'http://example.com/hbbank/{job_id}.htm',
+        'details': '岗位职责\n任职要求',
+        'list_hash': f'list-{job_id}',
+        'details_hash': f'details-{job_id}',
+        'crawl_time': '2026-01-01T09:00:00',
+    }
+    job.update(fields)
+    return job
+
+
+def dump_bytes(records):
+    """整体写入时 json.dump 生成的字节"""
+    return json.dumps(records, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'jobs_history.json'), str(tmp_path / 'jobs_history.ids')
+
+
+def test_append_is_byte_identical_to_full_dump(paths):
+    data_file, index_file = paths
+    records = {job_id: make_job(job_id) for job_id in ('a1', 'a2')}
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    for job_id in ('b1', 'b2', 'b3'):
+        records[job_id] = make_job(job_id)
+        store[job_id] = records[job_id]
+    store.save()
+
+    assert store._records is None  # 只追加，没有加载全部记录
+    assert read_bytes(data_file) == dump_bytes(records)
+
+    # 再追加一次，并用新实例确认读取结果
+    records['c1'] = make_job('c1')
+    store['c1'] = records['c1']
+    store.save()
+    assert read_bytes(data_file) == dump_bytes(records)
+    assert dict(JsonHistoryStore(data_file, index_file=index_file)) == records
+
+
+@pytest.mark.parametrize('initial', [None, '', '{}'])
+def test_first_write_to_missing_or_empty_file(paths, initial):
+    data_file, index_file = paths
+    if initial is not None:
+        with open(data_file, 'w', encoding='utf-8') as f:
+            f.write(initial)
+
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    assert len(store) == 0
+    records = {job_id: make_job(job_id) for job_id in ('a1', 'a2')}
+    for job_id, job in records.items():
+        store[job_id] = job
+    store.save()
+
+    assert read_bytes(data_file) == dump_bytes(records)
+    reloaded = JsonHistoryStore(data_file, index_file=index_file)
+    assert dict(reloaded) == records
+    assert reloaded.fingerprint('a1') == {
+        'list_hash': 'list-a1', 'details_hash': 'details-a1', 'crawl_time': '2026-01-01T09:00:00'
+    }
+
+
+def test_index_is_used_when_file_is_unchanged(paths, monkeypatch):
+    data_file, index_file = paths
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    store['a1'] = make_job('a1')
+    store.save()
+
+    def fail_load(self):
+        raise AssertionError('完整记录不应被加载')
+
+    monkeypatch.setattr(JsonHistoryStore, '_load_records', fail_load)
+    reloaded = JsonHistoryStore(data_file, index_file=index_file)
+    assert 'a1' in reloaded
+    assert reloaded.fingerprint('a1')['list_hash'] == 'list-a1'
+
+
+def test_index_is_rebuilt_when_size_changes(paths):
+    data_file, index_file = paths
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    store['a1'] = make_job('a1')
+    store.save()
+
+    # 其他程序直接修改了JSON文件（例如git合并）
+    records = {'a1': make_job('a1'), 'x9': make_job('x9')}
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+    reloaded = JsonHistoryStore(data_file, index_file=index_file)
+    assert 'x9' in reloaded
+    assert len(reloaded) == 2
+
+
+def test_index_is_rebuilt_when_only_mtime_changes(paths):
+    data_file, index_file = paths
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    store['a1'] = make_job('a1', list_hash='aaaa')
+    store.save()
+
+    # 大小不变、内容不同的修改，只能通过修改时间发现
+    content = read_bytes(data_file)
+    with open(data_file, 'wb') as f:
+        f.write(content.replace(b'"aaaa"', b'"bbbb"'))
+    stat = os.stat(data_file)
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert os.stat(data_file).st_size == len(content)
+
+    reloaded = JsonHistoryStore(data_file, index_file=index_file)
+    assert reloaded.fingerprint('a1')['list_hash'] == 'bbbb'
+
+
+def test_falls_back_to_full_rewrite_when_tail_is_unexpected(paths):
+    data_file, index_file = paths
+    records = {'a1': make_job('a1')}
+    # 合法的JSON，但结尾的 "}" 不在追加时检查的末尾范围内
+    with open(data_file, 'wb') as f:
+        f.write(dump_bytes(records) + b'\n' * 100)
+
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    records['b1'] = make_job('b1')
+    store['b1'] = records['b1']
+    store.save()
+
+    assert read_bytes(data_file) == dump_bytes(records)
+    assert dict(JsonHistoryStore(data_file, index_file=index_file)) == records
+
+
+def test_modifying_existing_job_rewrites_file(paths):
+    data_file, index_file = paths
+    store = JsonHistoryStore(data_file, index_file=index_file)
+    records = {job_id: make_job(job_id) for job_id in ('a1', 'a2')}
+    for job_id, job in records.items():
+        store[job_id] = job
+    store.save()
+
+    records['a1'] = make_job('a1', details='新的详情', details_hash='changed')
+    reloaded = JsonHistoryStore(data_file, index_file=index_file)
+    reloaded['a1'] = records['a1']
+    reloaded.save()
+
+    assert read_bytes(data_file) == dump_bytes(records)
+    assert JsonHistoryStore(data_file, index_file=index_file).fingerprint('a1')['details_hash'] == 'changed'